@@ -9,6 +9,7 @@ from openai import OpenAI
 load_dotenv()
 
 from agent.tools.fn_ingest import fn_ingest
+from agent.tools.fn_ingest_directory import fn_ingest_directory
 from agent.tools.fn_retrieve import fn_retrieve
 
 
@@ -19,7 +20,7 @@ def get_rag_tools():
             "type": "function",
             "function": {
                 "name": "fn_ingest",
-                "description": "Ingest PDF documents and store embeddings",
+                "description": "Ingest PDF documents and store embeddings; may run in the background and return a job_id",
                 "parameters": {
                     "type": "object",
                     "properties": {"file_path": {"type": "string"}},
@@ -27,21 +28,77 @@ def get_rag_tools():
                 },
             },
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "fn_ingest_directory",
+                "description": "Bulk-ingest every PDF in a directory (skips unchanged files); may run in the background and return a job_id",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"directory": {"type": "string"}},
+                    "required": ["directory"],
+                },
+            },
+        },
         {
             "type": "function",
             "function": {
                 "name": "fn_retrieve",
-                "description": "Retrieve relevant text chunks using vector search",
+                "description": "Retrieve relevant text chunks using hybrid keyword + vector search",
                 "parameters": {
                     "type": "object",
                     "properties": {
                         "query": {"type": "string"},
                         "k": {"type": "number"},
+                        "mode": {
+                            "type": "string",
+                            "enum": ["hybrid", "vector", "keyword"],
+                            "description": "Use keyword for exact identifiers, codes or names",
+                        },
+                        "source": {
+                            "type": "string",
+                            "description": "Only search chunks from this ingested file path",
+                        },
+                        "page_start": {
+                            "type": "integer",
+                            "description": "First page to search (1-based, inclusive)",
+                        },
+                        "page_end": {
+                            "type": "integer",
+                            "description": "Last page to search (1-based, inclusive)",
+                        },
+                        "ingested_after": {
+                            "type": "string",
+                            "description": "Only chunks ingested on or after this ISO date, e.g. 2024-05-01",
+                        },
                     },
                     "required": ["query"],
                 },
             },
         },
+        {
+            "type": "function",
+            "function": {
+                "name": "fn_job_status",
+                "description": "Status and progress of a background ingestion job, or of the latest jobs when job_id is omitted",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"job_id": {"type": "string"}},
+                },
+            },
+        },
+        {
+            "type": "function",
+            "function": {
+                "name": "fn_cancel_job",
+                "description": "Cancel a queued or running background ingestion job",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"job_id": {"type": "string"}},
+                    "required": ["job_id"],
+                },
+            },
+        },
     ]
 
 
@@ -51,7 +108,14 @@ def get_rag_instructions():
     You are a Retrieval-Augmented Generation (RAG) AI.
     Use these tools STRICTLY as required:
     - fn_ingest → to load documents
-    - fn_retrieve → to fetch relevant chunks
+    - fn_ingest_directory → to load every PDF in a folder
+    - fn_retrieve → to fetch relevant chunks (filter by source, pages or
+      ingest date when the user names a document or section)
+
+    - fn_job_status / fn_cancel_job → to check on or stop an ingestion
+
+    Ingestion may run in the background: when a tool returns a job_id, tell
+    the user it is in progress instead of waiting for it.
 
     Always use retrieved chunks to answer questions.
     If answer cannot be found, say "I don't know".
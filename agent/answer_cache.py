@@ -0,0 +1,130 @@
+# agent/answer_cache.py
+"""
+Semantic answer cache for repeated questions.
+
+An answer is reused when a new question's embedding is close enough to a
+cached question's, retrieval for it returns the same chunk IDs, and the
+corpus has not been re-ingested since (see store.corpus_version). Entries
+are namespaced per collection.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Thread-safe LRU of {question embedding, chunk IDs, corpus version, answer}.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 86400,
+        threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _evict(self, version: int, namespace: str):
+        cutoff = time.time() - self.ttl_seconds
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if entry["created"] < cutoff
+            or (entry["namespace"] == namespace and entry["version"] != version)
+        ]:
+            del self._entries[key]
+
+    def similar(self, embedding, version: int, namespace: str = None):
+        """
+        Cached entries for questions similar to `embedding`, most similar
+        first. Entries from an older corpus version are dropped here.
+        """
+        with self._lock:
+            self._evict(version, namespace)
+            keys = [
+                key
+                for key, entry in self._entries.items()
+                if entry["namespace"] == namespace
+            ]
+            if not keys:
+                return []
+            matrix = np.stack([self._entries[key]["embedding"] for key in keys])
+            scores = matrix @ self._normalize(embedding)
+            order = np.argsort(-scores)
+            return [
+                (keys[n], self._entries[keys[n]])
+                for n in order
+                if scores[n] >= self.threshold
+            ]
+
+    def get(self, embedding, version: int, chunk_ids, namespace: str = None):
+        """
+        Return a cached answer for a similar question that retrieved the same
+        chunks, or None. `chunk_ids` may be a callable, evaluated only when a
+        similar question is cached.
+        """
+        candidates = self.similar(embedding, version, namespace)
+        if candidates and callable(chunk_ids):
+            chunk_ids = chunk_ids()
+        with self._lock:
+            for key, entry in candidates:
+                if entry["chunk_ids"] == frozenset(chunk_ids) and key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def put(
+        self,
+        question: str,
+        embedding,
+        version: int,
+        chunk_ids,
+        answer: str,
+        namespace: str = None,
+    ):
+        with self._lock:
+            self._entries[self._next_key] = {
+                "namespace": namespace,
+                "question": question,
+                "embedding": self._normalize(embedding),
+                "version": version,
+                "chunk_ids": frozenset(chunk_ids),
+                "answer": answer,
+                "created": time.time(),
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,494 @@
+# agent/chat.py
+"""
+Chat Completions turn loop shared by the Streamlit UI and the CLI.
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+from openai import OpenAI
+
+from agent.agent_config import create_rag_agent
+from agent.context import ContextBuilder, dedupe_chunks
+from agent.metrics import (
+    COMPLETIONS,
+    TIME_TO_FIRST_TOKEN,
+    TOKENS,
+    TURN_SECONDS,
+    TURN_TOKENS,
+    TURNS,
+)
+from agent.routing import needs_retrieval
+from agent.settings import (
+    EAGER_RETRIEVAL,
+    HTTP_MAX_CONNECTIONS,
+    MAX_TOOL_ROUNDS,
+    TOOL_TIMEOUT,
+)
+from agent.store import (
+    DEFAULT_COLLECTION,
+    collection_path,
+    corpus_version,
+    get_answer_cache,
+    get_embeddings,
+)
+from agent.streaming import StreamedCompletion
+from agent.tools.dispatcher import (
+    TOOLS,
+    bind_collection,
+    dispatch_tool_calls,
+    prefetch_tool,
+)
+from agent.tracing import span, start_span, use_span
+
+NO_ANSWER = "I couldn't generate a response."
+
+# Tools whose answers may be cached: read-only lookups, no side effects
+CACHEABLE_TOOLS = {"fn_retrieve"}
+
+
+def create_openai_client():
+    """
+    OpenAI client with a keep-alive connection pool, meant to be shared.
+    """
+    return OpenAI(
+        http_client=httpx.Client(
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+    )
+
+
+class ChatTurn:
+    """
+    One user turn: stream a completion, run any requested tools concurrently,
+    and stream the follow-up, until the model answers without tool calls.
+
+    Iterating yields answer tokens as they arrive; the loop is driven by the
+    stream itself, so the turn ends as soon as the model does. Assistant
+    tool-call and tool messages are appended to `messages` in place.
+
+    `prefetched` is a list of (tool call, Future) started before the turn;
+    their results are added as if the model had requested them, so the first
+    completion already sees them.
+
+    `trace` is the turn's root span; completions and tool calls are traced
+    under it and it ends with the turn (see agent/tracing.py).
+
+    `cancel()`, or closing or interrupting the iteration, stops the turn:
+    tool calls still pending are dropped and no further completion starts.
+    """
+
+    cached = False
+
+    def __init__(
+        self,
+        client,
+        agent_config: dict,
+        messages: list,
+        on_tool_calls=None,
+        max_tool_rounds: int = MAX_TOOL_ROUNDS,
+        tools: dict = None,
+        on_complete=None,
+        prefetched=None,
+        trace=None,
+    ):
+        self.client = client
+        self.agent_config = agent_config
+        self.messages = messages
+        self.on_tool_calls = on_tool_calls
+        self.max_tool_rounds = max_tool_rounds
+        self.tools = tools
+        self.on_complete = on_complete
+        self.prefetched = prefetched or []
+        self.seen_chunks = set()
+        self.started = None
+        self.completions = []
+        self.tool_names = []
+        self.trace = trace or start_span("chat.turn", parent=None)
+        self.cancelled = threading.Event()
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def cancel(self):
+        """
+        Stop the turn from another thread, e.g. when the client went away.
+        """
+        self.cancelled.set()
+
+    def _create(self, tool_choice: str = "auto"):
+        completion = StreamedCompletion(
+            self.client.chat.completions.create(
+                model=self.agent_config["model"],
+                messages=self.messages,
+                tools=self.agent_config["tools"],
+                tool_choice=tool_choice,
+                stream=True,
+                # Token counts arrive in a final chunk, for the metrics
+                stream_options={"include_usage": True},
+            ),
+            self.started,
+        )
+        self.completions.append(completion)
+        COMPLETIONS.inc()
+        return completion
+
+    def _record_metrics(self):
+        TURNS.inc(cached="false")
+        if self.total_time is not None:
+            TURN_SECONDS.observe(self.total_time, cached="false")
+        if self.time_to_first_token is not None:
+            TIME_TO_FIRST_TOKEN.observe(self.time_to_first_token)
+        usages = [c.usage for c in self.completions if c.usage is not None]
+        if usages:
+            tokens_in = sum(u.prompt_tokens or 0 for u in usages)
+            tokens_out = sum(u.completion_tokens or 0 for u in usages)
+            TOKENS.inc(tokens_in, direction="in")
+            TOKENS.inc(tokens_out, direction="out")
+            TURN_TOKENS.observe(tokens_in, direction="in")
+            TURN_TOKENS.observe(tokens_out, direction="out")
+
+    def _add_tool_calls(self, tool_calls, content=None):
+        self.messages.append(
+            {
+                "role": "assistant",
+                "content": content,
+                "tool_calls": [
+                    {
+                        "id": tc.id,
+                        "type": tc.type,
+                        "function": {
+                            "name": tc.function.name,
+                            "arguments": tc.function.arguments,
+                        },
+                    }
+                    for tc in tool_calls
+                ],
+            }
+        )
+        self.tool_names.extend(tc.function.name for tc in tool_calls)
+        if self.on_tool_calls is not None:
+            self.on_tool_calls(tool_calls)
+
+    def _add_tool_results(self, results):
+        for tool_call, result in results:
+            self.messages.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "content": json.dumps(dedupe_chunks(result, self.seen_chunks)),
+                }
+            )
+
+    def _resolve(self, future):
+        try:
+            return future.result(timeout=TOOL_TIMEOUT)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def __iter__(self):
+        self.started = time.perf_counter()
+        try:
+            yield from self._run()
+        except Exception as e:
+            self.trace.record_error(e)
+            raise
+        finally:
+            # Also on KeyboardInterrupt or GeneratorExit: drop pending tools
+            self.cancelled.set()
+            self.trace.set(rounds=len(self.completions), tools=len(self.tool_names))
+            self.trace.end()
+            self._record_metrics()
+
+    def _run(self):
+        if self.prefetched:
+            with use_span(self.trace), span("tools.prefetch_wait"):
+                self._add_tool_calls([tool_call for tool_call, _ in self.prefetched])
+                self._add_tool_results(
+                    (tool_call, self._resolve(future))
+                    for tool_call, future in self.prefetched
+                )
+
+        for n in range(self.max_tool_rounds + 1):
+            if self.cancelled.is_set():
+                return
+            # The last round must answer: tools it asked for would never be
+            # followed by another completion
+            last = n == self.max_tool_rounds
+            # Spans are ended by hand: the block spans yields to the caller
+            llm_span = start_span("llm.completion", parent=self.trace, round=n)
+            try:
+                completion = self._create(tool_choice="none" if last else "auto")
+                yield from completion
+            except Exception as e:
+                llm_span.end(error=e)
+                raise
+            tool_calls = completion.tool_calls
+            if completion.time_to_first_token is not None:
+                llm_span.set(ttft_ms=round(completion.time_to_first_token * 1000, 3))
+            llm_span.set(tool_calls=len(tool_calls or []))
+            llm_span.end()
+            if not tool_calls or last:
+                break
+
+            self._add_tool_calls(tool_calls, completion.content)
+            # Execute independent tool calls concurrently
+            with use_span(self.trace), span("tools.dispatch", calls=len(tool_calls)):
+                results = dispatch_tool_calls(
+                    tool_calls, cancel_event=self.cancelled, tools=self.tools
+                )
+                self._add_tool_results(results)
+
+        if self.on_complete is not None:
+            self.on_complete(self)
+
+    def consume(self):
+        """
+        Run the turn without rendering tokens; returns the answer.
+        """
+        for _ in self:
+            pass
+        return self.answer
+
+    @property
+    def answer(self):
+        return self.completions[-1].content if self.completions else ""
+
+    @property
+    def time_to_first_token(self):
+        for completion in self.completions:
+            if completion.time_to_first_token is not None:
+                return completion.time_to_first_token
+        return None
+
+    @property
+    def total_time(self):
+        return self.completions[-1].total_time if self.completions else None
+
+
+class CachedTurn:
+    """
+    A turn answered from the semantic answer cache, without calling the model.
+    Same interface as ChatTurn.
+    """
+
+    cached = True
+
+    def __init__(self, answer: str, on_complete=None, trace=None):
+        self.answer = answer
+        self.on_complete = on_complete
+        self.trace = trace or start_span("chat.turn", parent=None)
+        self.completions = []
+        self.tool_names = []
+        self.time_to_first_token = None
+        self.total_time = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def cancel(self):
+        pass
+
+    def __iter__(self):
+        started = time.perf_counter()
+        self.time_to_first_token = time.perf_counter() - started
+        try:
+            yield self.answer
+            self.total_time = time.perf_counter() - started
+            if self.on_complete is not None:
+                self.on_complete(self)
+        finally:
+            self.trace.set(cached=True)
+            self.trace.end()
+            TURNS.inc(cached="true")
+            if self.total_time is not None:
+                TURN_SECONDS.observe(self.total_time, cached="true")
+
+    def consume(self):
+        for _ in self:
+            pass
+        return self.answer
+
+
+class ChatEngine:
+    """
+    Conversation engine shared by the UI and the CLI.
+
+    Holds the (pooled) OpenAI client, agent configuration, tool registry and
+    the user/assistant history of one conversation. The client and config
+    are meant to be created once per process and passed to every engine.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        agent_config: dict = None,
+        tools: dict = None,
+        context_budget: int = None,
+        answer_cache=None,
+        eager_retrieval: bool = EAGER_RETRIEVAL,
+        collection: str = None,
+    ):
+        self.client = client or create_openai_client()
+        self.agent_config = agent_config or create_rag_agent()
+        self.registry = TOOLS if tools is None else tools
+        self.collection = collection
+        self.answer_cache = get_answer_cache() if answer_cache is None else answer_cache
+        self.eager_retrieval = eager_retrieval
+        self.context = ContextBuilder(self.agent_config["model"], context_budget)
+        self.history = []
+
+    @property
+    def tools(self):
+        """
+        Tool registry for this conversation, pinned to its collection (the
+        default one when none is set) so the model can't reach another.
+        """
+        return bind_collection(self.registry, self.collection or DEFAULT_COLLECTION)
+
+    def build_messages(self, user_message: str):
+        """
+        API messages for the next turn: system prompt, the history that fits
+        the context budget (older turns summarized), and the new message.
+        """
+        return self.context.build(
+            self.agent_config["instructions"], self.history, user_message
+        )
+
+    def _prefetch(self, user_message: str):
+        """
+        Eager RAG: start fn_retrieve for the message now, presented to the
+        model as a call it made itself so it can still search again.
+        """
+        if (
+            not self.eager_retrieval
+            or "fn_retrieve" not in self.tools
+            or not needs_retrieval(user_message)
+        ):
+            return []
+        arguments = {"query": user_message}
+        tool_call = SimpleNamespace(
+            id="eager_fn_retrieve",
+            type="function",
+            function=SimpleNamespace(
+                name="fn_retrieve", arguments=json.dumps(arguments)
+            ),
+        )
+        return [(tool_call, prefetch_tool("fn_retrieve", arguments, self.tools))]
+
+    def _retrieved_ids(self, user_message: str, prefetched=None):
+        """
+        Chunk IDs retrieved for the message itself: the cache key's second half.
+        """
+        if prefetched:
+            result = prefetched[0][1].result(timeout=TOOL_TIMEOUT)
+        else:
+            result = self.tools["fn_retrieve"](query=user_message)
+        return frozenset(
+            chunk["id"]
+            for chunk in result.get("chunks", [])
+            if isinstance(chunk, dict) and "id" in chunk
+        )
+
+    def ask(self, user_message: str, on_tool_calls=None):
+        """
+        Start a turn. Iterate the returned ChatTurn to stream the answer; the
+        exchange is added to the history once the turn completes.
+
+        Standalone questions (no earlier turns to depend on) are looked up in
+        the semantic answer cache first and, on a hit, answered with a
+        CachedTurn without calling the model. In eager mode retrieval starts
+        here, overlapping the cache lookup and prompt construction.
+
+        Each turn is one trace rooted at a "chat.turn" span; its ID is the
+        returned turn's `trace_id`.
+        """
+        root = start_span(
+            "chat.turn",
+            parent=None,
+            collection=self.collection or DEFAULT_COLLECTION,
+            eager=bool(self.eager_retrieval),
+        )
+        with use_span(root):
+            turn = self._start_turn(user_message, on_tool_calls, root)
+        return turn
+
+    def _start_turn(self, user_message: str, on_tool_calls, root):
+        prefetched = self._prefetch(user_message)
+        store_dir = collection_path(self.collection)
+        cache = self.answer_cache
+        if self.history or "fn_retrieve" not in self.tools:
+            cache = None
+        answer = None
+        if cache is not None:
+            key = {}
+
+            def retrieved_ids():
+                if "ids" not in key:
+                    key["ids"] = self._retrieved_ids(user_message, prefetched)
+                return key["ids"]
+
+            try:
+                with span("cache.lookup") as lookup:
+                    embedding = get_embeddings().embed_query(user_message)
+                    version = corpus_version(store_dir)
+                    answer = cache.get(
+                        embedding, version, retrieved_ids, namespace=store_dir
+                    )
+                    lookup.set(hit=answer is not None)
+            except Exception:
+                # The cache is an optimization; fall through to the model
+                cache = None
+            if answer is not None:
+                return CachedTurn(
+                    answer,
+                    on_complete=lambda turn: self.add_exchange(user_message, answer),
+                    trace=root,
+                )
+
+        def record(turn):
+            self.add_exchange(user_message, turn.answer or NO_ANSWER)
+            if (
+                cache is not None
+                and turn.answer
+                and set(turn.tool_names) <= CACHEABLE_TOOLS
+                and corpus_version(store_dir) == version
+            ):
+                try:
+                    cache.put(
+                        user_message,
+                        embedding,
+                        version,
+                        retrieved_ids(),
+                        turn.answer,
+                        namespace=store_dir,
+                    )
+                except Exception:
+                    pass
+
+        return ChatTurn(
+            self.client,
+            self.agent_config,
+            self.build_messages(user_message),
+            on_tool_calls=on_tool_calls,
+            tools=self.tools,
+            on_complete=record,
+            prefetched=prefetched,
+            trace=root,
+        )
+
+    def add_exchange(self, user_message: str, answer: str):
+        self.history.append({"role": "user", "content": user_message})
+        self.history.append({"role": "assistant", "content": answer})
+
+    def reset(self):
+        self.history = []
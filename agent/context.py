@@ -0,0 +1,150 @@
+# agent/context.py
+"""
+Token-budgeted prompt construction for long conversations.
+"""
+
+import json
+from functools import lru_cache
+
+from agent.settings import CONTEXT_BUDGET, CONTEXT_BUDGETS, KEEP_RECENT_TURNS
+
+try:
+    import tiktoken
+except ImportError:  # fall back to a character-based estimate
+    tiktoken = None
+
+# Per-message framing overhead in the Chat Completions format
+MESSAGE_OVERHEAD = 4
+SUMMARY_PREFIX = "Summary of earlier conversation:\n"
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:  # BPE files are downloaded on first use; may be offline
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count tokens locally (tiktoken when installed, ~4 chars/token otherwise).
+    """
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def message_tokens(message: dict, model: str = "gpt-4o") -> int:
+    tokens = MESSAGE_OVERHEAD + count_tokens(message.get("content") or "", model)
+    for tool_call in message.get("tool_calls") or []:
+        tokens += count_tokens(tool_call["function"]["arguments"], model)
+    return tokens
+
+
+def context_budget(model: str) -> int:
+    return CONTEXT_BUDGETS.get(model, CONTEXT_BUDGET)
+
+
+def summarize_messages(messages, max_chars: int = 160) -> str:
+    """
+    Compact extractive summary: one line per message, truncated.
+    """
+    lines = []
+    for message in messages:
+        text = " ".join((message.get("content") or "").split())
+        if len(text) > max_chars:
+            text = text[: max_chars - 1].rstrip() + "…"
+        lines.append(f"- {message['role']}: {text}")
+    return "\n".join(lines)
+
+
+class ContextBuilder:
+    """
+    Build the message list for a turn within a token budget.
+
+    The system prompt and the new user message are always sent. The most
+    recent `keep_recent_turns` exchanges are kept verbatim while they fit;
+    older messages are folded into a short extractive summary whose oldest
+    lines are dropped first when the budget runs out.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        budget: int = None,
+        keep_recent_turns: int = KEEP_RECENT_TURNS,
+    ):
+        self.model = model
+        self.budget = budget or context_budget(model)
+        self.keep_recent_turns = keep_recent_turns
+
+    def build(self, system_prompt: str, history, user_message: str):
+        system = {"role": "system", "content": system_prompt}
+        user = {"role": "user", "content": user_message}
+        remaining = self.budget - message_tokens(system, self.model)
+        remaining -= message_tokens(user, self.model)
+
+        history = list(history)
+        recent = (
+            history[-self.keep_recent_turns * 2 :] if self.keep_recent_turns else []
+        )
+        kept = []
+        for message in reversed(recent):
+            tokens = message_tokens(message, self.model)
+            if tokens > remaining:
+                break
+            kept.append(message)
+            remaining -= tokens
+        kept.reverse()
+
+        messages = [system]
+        older = history[: len(history) - len(kept)]
+        if older:
+            summary = summarize_messages(older)
+            # Drop the oldest summary lines until it fits
+            while summary and count_tokens(summary, self.model) + 16 > remaining:
+                summary = summary.split("\n", 1)[1] if "\n" in summary else ""
+            if summary:
+                messages.append({"role": "system", "content": SUMMARY_PREFIX + summary})
+        messages.extend(kept)
+        messages.append(user)
+        return messages
+
+
+def dedupe_chunks(result, seen: set):
+    """
+    Drop retrieved chunks already present earlier in the turn's context.
+
+    `seen` is updated in place; the result is returned with a count of the
+    chunks that were omitted so the model knows they were not lost.
+    """
+    if not isinstance(result, dict) or not isinstance(result.get("chunks"), list):
+        return result
+
+    chunks = []
+    for chunk in result["chunks"]:
+        if isinstance(chunk, str):
+            key = chunk
+        elif isinstance(chunk, dict) and "id" in chunk:
+            # Scores differ between searches; the chunk ID does not
+            key = chunk["id"]
+        else:
+            key = json.dumps(chunk, sort_keys=True)
+        if key in seen:
+            continue
+        seen.add(key)
+        chunks.append(chunk)
+
+    omitted = len(result["chunks"]) - len(chunks)
+    if not omitted:
+        return result
+    return {**result, "chunks": chunks, "omitted_duplicates": omitted}
@@ -0,0 +1,234 @@
+# agent/embedding_cache.py
+"""
+Caching layers in front of the embedding client.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text: str) -> str:
+    """
+    Normalize a query so trivially different phrasings share a cache entry.
+    """
+    return " ".join(text.casefold().split()).rstrip("?!. ")
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded LRU cache of query embeddings with a time-to-live.
+
+    Keys are the normalized query text plus the embedding model name. When
+    `path` is set the cache can be saved to and reloaded from a JSON file.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600, path=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def _key(text: str, model: str) -> str:
+        return f"{model}\x00{normalize_query(text)}"
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def get(self, text: str, model: str):
+        key = self._key(text, model)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0], now):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, text: str, model: str, vector):
+        key = self._key(text, model)
+        with self._lock:
+            self._entries[key] = (time.time(), list(vector))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def save(self):
+        """
+        Write the live entries to `path` (no-op when persistence is disabled).
+        """
+        if not self.path:
+            return
+        now = time.time()
+        with self._lock:
+            entries = [
+                [key, created_at, vector]
+                for key, (created_at, vector) in self._entries.items()
+                if not self._expired(created_at, now)
+            ]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """
+        Load entries saved by `save`, dropping the ones that have expired.
+        """
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            for key, created_at, vector in entries[-self.max_entries :]:
+                if not self._expired(created_at, now):
+                    self._entries[key] = (created_at, vector)
+
+
+def content_hash(text: str, model: str = "") -> str:
+    """
+    Stable content address for `text` embedded with `model`.
+    """
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class ChunkEmbeddingCache:
+    """
+    SQLite-backed map from chunk content hash to its embedding vector.
+
+    Vectors are stored as packed float32 so an unchanged chunk is never sent
+    to the embedding API twice, whichever file or ingest run it comes from.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        keys = list(keys)
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM chunk_embeddings WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def put_many(self, items: dict):
+        rows = [(key, array("f", vector).tobytes()) for key, vector in items.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_embeddings (key, vector) VALUES (?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute(
+                "SELECT COUNT(*) FROM chunk_embeddings"
+            ).fetchone()
+            return {"size": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that answers repeated queries from a QueryEmbeddingCache
+    and previously seen chunks from a ChunkEmbeddingCache.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        query_cache: QueryEmbeddingCache,
+        chunk_cache: ChunkEmbeddingCache = None,
+    ):
+        self.embeddings = embeddings
+        self.model = model
+        self.query_cache = query_cache
+        self.chunk_cache = chunk_cache
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        if self.chunk_cache is None:
+            return self.embeddings.embed_documents(texts)
+
+        keys = [content_hash(text, self.model) for text in texts]
+        vectors = self.chunk_cache.get_many(keys)
+
+        # Only send texts we have never embedded, each one once
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), new_vectors))
+            self.chunk_cache.put_many(fresh)
+            vectors.update(fresh)
+
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text):
+        vector = self.query_cache.get(text, self.model)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.query_cache.put(text, self.model, vector)
+        return vector
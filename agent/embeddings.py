@@ -0,0 +1,163 @@
+# agent/embeddings.py
+"""
+Pluggable embedding backends, selected with EMBEDDING_BACKEND.
+
+- openai: OpenAIEmbeddings (network round trip per batch)
+- hashing: local feature-hashing projector, batched in NumPy across threads
+- sentence-transformers: local transformer model (optional dependency)
+- fake: deterministic pseudo-random vectors for tests and benchmarks
+"""
+
+import hashlib
+import re
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from agent.settings import EMBEDDING_BACKEND, EMBEDDING_DIM, EMBEDDING_THREADS
+
+WORD_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=1 << 18)
+def _bucket(feature: str, dim: int):
+    """
+    Stable (index, sign) of a hashed feature; crc32 is identical across processes.
+    """
+    h = zlib.crc32(feature.encode("utf-8"))
+    return h % dim, 1.0 if (h >> 31) & 1 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Offline embedding: signed feature hashing of words, word bigrams and
+    character trigrams into `dim` buckets, with sublinear term weighting and
+    L2 normalization. Texts are embedded in batches of `batch_size`, each
+    batch as one NumPy bincount, spread over `threads` workers.
+    """
+
+    def __init__(self, dim: int = 384, batch_size: int = 256, threads: int = 1):
+        self.dim = dim
+        self.batch_size = batch_size
+        self.threads = max(1, threads)
+        self._executor = (
+            ThreadPoolExecutor(self.threads, thread_name_prefix="embed")
+            if self.threads > 1
+            else None
+        )
+
+    def _features(self, text: str):
+        words = WORD_RE.findall(text.lower())
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def _embed_batch(self, texts):
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                col, sign = _bucket(feature, self.dim)
+                rows.append(row)
+                cols.append(col)
+                values.append(sign)
+
+        flat = np.asarray(rows, dtype=np.int64) * self.dim + np.asarray(cols)
+        matrix = np.bincount(
+            flat, weights=values, minlength=len(texts) * self.dim
+        ).reshape(len(texts), self.dim)
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.maximum(norms, 1e-12)).astype(np.float32)
+
+    def embed_array(self, texts) -> np.ndarray:
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        batches = [
+            texts[i : i + self.batch_size]
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        if self._executor is None or len(batches) == 1:
+            return np.vstack([self._embed_batch(batch) for batch in batches])
+        return np.vstack(list(self._executor.map(self._embed_batch, batches)))
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self._embed_batch([text])[0].tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic unit vectors seeded from the text hash; identical text always
+    gets the identical vector, in any process.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _vector(self, text: str):
+        seed = int.from_bytes(
+            hashlib.sha256(text.encode("utf-8")).digest()[:8], "little"
+        )
+        vector = np.random.default_rng(seed).standard_normal(self.dim)
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
+
+    def embed_documents(self, texts):
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Local sentence-transformers model, encoded in batches on CPU.
+    """
+
+    def __init__(self, model: str, batch_size: int = 64, threads: int = 1):
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=sentence-transformers requires: "
+                "pip install sentence-transformers"
+            ) from e
+
+        torch.set_num_threads(max(1, threads))
+        self.model = SentenceTransformer(model, device="cpu")
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True
+        )
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def create_embeddings(model: str, backend: str = EMBEDDING_BACKEND) -> Embeddings:
+    """
+    Build the raw (uncached) embedding client for `backend`.
+    """
+    if backend == "openai":
+        from langchain_community.embeddings import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=model)
+    if backend == "hashing":
+        return HashingEmbeddings(dim=EMBEDDING_DIM, threads=EMBEDDING_THREADS)
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbeddings(model, threads=EMBEDDING_THREADS)
+    if backend == "fake":
+        return FakeEmbeddings(dim=EMBEDDING_DIM)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
@@ -0,0 +1,32 @@
+# agent/file_lock.py
+"""
+Exclusive lock on a file, held across processes.
+
+The UI, CLI, API workers and job workers can all write to the same store
+directory; writers take this lock around read-modify-write cycles.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locks apply
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive lock on `path` (created if missing) for the block.
+    Not re-entrant: don't nest two locks on the same path.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,88 @@
+# agent/filters.py
+"""
+Metadata filters for retrieval, in Chroma's `where` syntax so they can be
+pushed down to Chroma as-is and evaluated the same way by the flat store and
+the keyword index.
+"""
+
+import os
+from datetime import datetime
+
+
+def to_timestamp(value):
+    """
+    Epoch seconds from a number or an ISO date/datetime string.
+    """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def build_where(source=None, page_start=None, page_end=None, ingested_after=None):
+    """
+    Build a `where` filter; pages are 1-based and inclusive (PyPDFLoader
+    stores 0-based `page` metadata) and `source` may be relative, as chunks
+    store absolute paths. Returns None when nothing is filtered.
+    """
+    conditions = []
+    if source:
+        conditions.append({"source": os.path.abspath(source)})
+    if page_start is not None:
+        conditions.append({"page": {"$gte": int(page_start) - 1}})
+    if page_end is not None:
+        conditions.append({"page": {"$lte": int(page_end) - 1}})
+    if ingested_after is not None:
+        conditions.append({"ingested_at": {"$gte": to_timestamp(ingested_after)}})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+def conditions_of(where: dict):
+    """
+    Flatten a top-level `$and` (or implicit and) into single-key conditions.
+    """
+    if set(where) == {"$and"}:
+        return list(where["$and"])
+    return [{key: value} for key, value in where.items()]
+
+
+def matches(metadata: dict, where: dict) -> bool:
+    """
+    Evaluate a Chroma-style `where` filter against one metadata dict.
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches(metadata, c) for c in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(metadata, c) for c in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > operand:
+                        return False
+                    if op == "$gte" and not value >= operand:
+                        return False
+                    if op == "$lt" and not value < operand:
+                        return False
+                    if op == "$lte" and not value <= operand:
+                        return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
@@ -0,0 +1,728 @@
+# agent/flat_store.py
+"""
+Flat vector store on memory-mapped files.
+
+Each generation of the store is a set of append-only files: `vectors.<g>.bin`
+(L2-normalized rows, float32 or float16), `documents.<g>.bin` (chunk texts)
+and `rows.<g>.jsonl`, a log with one line per write listing the new rows'
+ids, metadata and text offsets plus the rows it deletes. `CURRENT` names the
+live generation and its dimension. Opening maps the vectors without reading
+them and parses only the small log, never the texts; a write appends just
+its own rows, and other processes pick up the new log lines on their next
+search while sharing the mapped pages. Replaced and deleted rows become
+tombstones until they outnumber live rows, when the live rows are copied
+into a new generation. Writers serialize on a file lock, so several
+processes can ingest into one store.
+
+Searches run against an immutable snapshot (row count, vector maps and
+tombstone mask as of one load), so a concurrent write never changes the
+arrays a query is reading.
+
+With dtype "int8" the scan runs over `codes.<g>.bin` (per-vector symmetric
+int8 scalar quantization, scales in `scales.<g>.bin`) and only the best
+`rerank_factor * k` candidates are re-scored exactly against the float32
+vectors, whose pages otherwise stay cold on disk.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from langchain_core.documents import Document
+
+from agent.file_lock import file_lock
+from agent.filters import conditions_of, matches
+
+# Numeric metadata kept as columns so range filters are one vectorized compare
+INDEXED_COLUMNS = ("page", "ingested_at")
+
+_RANGE_OPS = {
+    "$eq": np.equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+# Rows converted per block when scoring float16 / int8 vectors (cache-sized)
+SCORE_BLOCK = 4096
+
+# Compact once tombstones outnumber live rows and there are at least this many
+COMPACT_MIN_DEAD_ROWS = 1024
+# Rows copied per block when compacting or converting an old store
+COMPACT_BLOCK = 65536
+
+
+def quantize_int8(vectors):
+    """
+    Per-vector symmetric int8 quantization. Returns (codes, scales).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0 if len(vectors) else np.zeros(0)
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def top_k(scores, k: int):
+    """
+    Indices of the `k` largest scores, best first.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def quantization_report(vectors, queries, k: int = 10, rerank_factor: int = 4):
+    """
+    Compare compact encodings with full-precision search on `vectors`.
+
+    Returns bytes per vector that every query scans ("hot") and that the
+    store keeps on disk (int8 keeps the float32 vectors for re-ranking, so
+    it uses more disk, not less), and mean recall@k against exact float32
+    top-k for float16, int8 without re-ranking and int8 with exact
+    re-ranking of `rerank_factor * k` candidates.
+    """
+    vectors = np.array(vectors, dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    queries = np.asarray(queries, dtype=np.float32)
+    dim = vectors.shape[1]
+
+    half = vectors.astype(np.float16).astype(np.float32)
+    codes, scales = quantize_int8(vectors)
+    approx = codes.astype(np.float32) * scales[:, None]
+
+    recall = {"float16": 0.0, "int8": 0.0, "int8_rerank": 0.0}
+    for query in queries:
+        exact = set(top_k(vectors @ query, k).tolist())
+        recall["float16"] += len(exact & set(top_k(half @ query, k).tolist()))
+        approx_scores = approx @ query
+        recall["int8"] += len(exact & set(top_k(approx_scores, k).tolist()))
+        candidates = top_k(approx_scores, k * rerank_factor)
+        reranked = candidates[top_k(vectors[candidates] @ query, k)]
+        recall["int8_rerank"] += len(exact & set(reranked.tolist()))
+
+    total = max(len(queries) * min(k, len(vectors)), 1)
+    return {
+        "vectors": len(vectors),
+        "dim": dim,
+        "k": k,
+        "hot_bytes_per_vector": {
+            "float32": 4 * dim,
+            "float16": 2 * dim,
+            "int8": dim + 4,
+        },
+        "disk_bytes_per_vector": {
+            "float32": 4 * dim,
+            "float16": 2 * dim,
+            "int8": 4 * dim + dim + 4,
+        },
+        "recall_at_k": {name: hits / total for name, hits in recall.items()},
+    }
+
+
+class _Generation:
+    """
+    Everything read so far from one generation's files. The lists and dicts
+    only ever grow (row numbers are never reused), so snapshots can share them
+    and just ignore rows at or past their own row count.
+    """
+
+    def __init__(self, directory: str, number: int, dim: int, dtype: str):
+        self.number = number
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.paths = {
+            name: os.path.join(directory, f"{name}.{number}.{ext}")
+            for name, ext in (
+                ("rows", "jsonl"),
+                ("vectors", "bin"),
+                ("documents", "bin"),
+                ("codes", "bin"),
+                ("scales", "bin"),
+            )
+        }
+        self.log_offset = 0
+        self.ids = []
+        self.metadatas = []
+        self.spans = []  # (byte offset, length) of each text in documents
+        self.positions = {}  # id -> its newest row
+        self.by_source = {}  # source -> [row]
+        self.alive = np.zeros(0, dtype=bool)
+        self.columns = {name: np.zeros(0) for name in INDEXED_COLUMNS}
+        self.documents_end = 0
+        self._documents = None
+        self._documents_lock = threading.Lock()
+
+    def apply(self, record: dict):
+        start = len(self.ids)
+        metadatas = record.get("metadatas", [])
+        self.ids.extend(record.get("ids", []))
+        self.metadatas.extend(metadatas)
+        self.spans.extend(tuple(span) for span in record.get("spans", []))
+        for n, (doc_id, metadata) in enumerate(zip(record.get("ids", []), metadatas)):
+            self.positions[doc_id] = start + n
+            self.by_source.setdefault(metadata.get("source"), []).append(start + n)
+        if self.spans:
+            self.documents_end = sum(self.spans[-1])
+
+        # New arrays rather than in-place updates: snapshots keep the old ones
+        alive = np.concatenate([self.alive, np.ones(len(metadatas), dtype=bool)])
+        for row in record.get("deleted", []):
+            alive[row] = False
+            if self.positions.get(self.ids[row]) == row:
+                del self.positions[self.ids[row]]
+        self.alive = alive
+        for name in INDEXED_COLUMNS:
+            new = np.array([m.get(name, np.nan) for m in metadatas], dtype=np.float64)
+            self.columns[name] = np.concatenate([self.columns[name], new])
+
+    def code_rows(self) -> int:
+        try:
+            codes = os.path.getsize(self.paths["codes"]) // max(self.dim, 1)
+            scales = os.path.getsize(self.paths["scales"]) // 4
+        except FileNotFoundError:
+            return 0
+        return min(codes, scales)
+
+    def read_documents(self, rows):
+        """
+        Texts of `rows`, read from the documents file on demand.
+        """
+        with self._documents_lock:
+            if self._documents is None:
+                # Kept open: still readable after a compaction unlinks it
+                self._documents = open(self.paths["documents"], "rb")
+            texts = []
+            for row in rows:
+                offset, length = self.spans[row]
+                self._documents.seek(offset)
+                texts.append(self._documents.read(length).decode("utf-8"))
+            return texts
+
+
+class _Snapshot:
+    """
+    Immutable view of the store as of one load: `n` rows, the vectors mapped
+    for exactly those rows and the tombstone mask at that point. A search
+    reads only its snapshot, so concurrent writes can't change it mid-query.
+    """
+
+    def __init__(self, generation=None, quantized=False):
+        self.generation = generation
+        self.n = len(generation.ids) if generation else 0
+        self.alive = generation.alive if generation else np.zeros(0, dtype=bool)
+        self.columns = dict(generation.columns) if generation else {}
+        self.live = int(self.alive.sum())
+        self.vectors = self.codes = self.scales = None
+        self._source_rows = {}
+        self._live_rows = None
+        if self.n:
+            paths, dim = generation.paths, generation.dim
+            self.vectors = np.memmap(
+                paths["vectors"], generation.dtype, "r", shape=(self.n, dim)
+            )
+            if quantized:
+                self.codes = np.memmap(
+                    paths["codes"], np.int8, "r", shape=(self.n, dim)
+                )
+                self.scales = np.memmap(paths["scales"], np.float32, "r", shape=self.n)
+
+    def has_row(self, row) -> bool:
+        return row is not None and row < self.n and self.alive[row]
+
+    def live_rows(self):
+        """
+        Row numbers not deleted, or None when every row is live.
+        """
+        if self.live == self.n:
+            return None
+        if self._live_rows is None:
+            self._live_rows = np.flatnonzero(self.alive)
+        return self._live_rows
+
+    def source_rows(self, source):
+        rows = self._source_rows.get(source)
+        if rows is None:
+            rows = np.array(
+                self.generation.by_source.get(source, []) if self.generation else [],
+                dtype=np.intp,
+            )
+            rows = rows[rows < self.n]
+            rows = self._source_rows[source] = rows[self.alive[rows]]
+        return rows
+
+
+class FlatVectorStore:
+    """
+    Drop-in alternative to ChromaStore for small and medium corpora.
+    """
+
+    def __init__(
+        self,
+        persist_directory: str,
+        embedding_function,
+        dtype="float32",
+        rerank_factor: int = 4,
+    ):
+        self.directory = os.path.join(persist_directory, "flat")
+        self.current_path = os.path.join(self.directory, "CURRENT")
+        self.lock_path = os.path.join(self.directory, "write.lock")
+        self._embedding_function = embedding_function
+        self.dtype = np.dtype(dtype)
+        self.quantized = self.dtype == np.int8
+        # int8 keeps exact float32 vectors on disk for re-ranking
+        self.storage_dtype = np.dtype(np.float32) if self.quantized else self.dtype
+        self.rerank_factor = rerank_factor
+        self._lock = threading.RLock()
+        self._generation = None
+        self._snapshot_cache = None
+        self._version = None
+
+    # -- loading -----------------------------------------------------------
+
+    def _file_version(self):
+        try:
+            current = os.stat(self.current_path)
+        except FileNotFoundError:
+            return None
+        generation = self._generation
+        try:
+            rows = os.stat(generation.paths["rows"]).st_size if generation else None
+        except FileNotFoundError:
+            rows = -1  # compacted away: re-read CURRENT
+        return current.st_ino, current.st_mtime_ns, rows
+
+    def _read_current(self):
+        try:
+            with open(self.current_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_current(self, number: int, dim: int, dtype):
+        tmp_path = f"{self.current_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"generation": number, "dim": dim, "dtype": str(dtype)}, f)
+        os.replace(tmp_path, self.current_path)
+
+    def _refresh(self):
+        """
+        Read whatever was appended since the last load (or a new generation
+        after a compaction) and publish a new snapshot.
+        """
+        with self._lock:
+            for _ in range(5):
+                version = self._file_version()
+                current = self._read_current()
+                if current is None:
+                    self._generation = None
+                    self._snapshot_cache = _Snapshot()
+                    self._version = version
+                    return
+                generation = self._generation
+                if generation is None or generation.number != current["generation"]:
+                    generation = _Generation(
+                        self.directory,
+                        current["generation"],
+                        current["dim"],
+                        current["dtype"],
+                    )
+                try:
+                    with open(generation.paths["rows"], "rb") as f:
+                        f.seek(generation.log_offset)
+                        data = f.read()
+                except FileNotFoundError:
+                    continue  # compacted while we looked; read CURRENT again
+                # Only complete lines: a writer may be mid-append
+                complete = data.rfind(b"\n") + 1
+                for line in data[:complete].splitlines():
+                    generation.apply(json.loads(line))
+                generation.log_offset += complete
+                self._generation = generation
+                self._snapshot_cache = _Snapshot(
+                    generation,
+                    self.quantized and generation.code_rows() >= len(generation.ids),
+                )
+                self._version = version
+                return
+            raise RuntimeError(f"Flat store at {self.directory} keeps changing")
+
+    def _snapshot(self) -> _Snapshot:
+        snapshot = self._snapshot_cache
+        if snapshot is not None and self._file_version() == self._version:
+            return snapshot
+        with self._lock:
+            self._refresh()
+            generation = self._generation
+            if (
+                self.quantized
+                and generation is not None
+                and generation.code_rows() < len(generation.ids)
+            ):
+                # Written without quantization: encode the missing rows once
+                with self._writing() as generation:
+                    start = generation.code_rows()
+                    vectors = self._snapshot_cache.vectors[start:]
+                    self._append_codes(generation, start, vectors)
+                self._refresh()
+            return self._snapshot_cache
+
+    def filter_rows(self, where: dict, snapshot: _Snapshot = None):
+        """
+        Live row numbers matching `where`. Source equality and page/date
+        ranges use the indexes; anything else falls back to a metadata scan.
+        """
+        snapshot = snapshot or self._snapshot()
+        rows = None
+        for condition in conditions_of(where):
+            (key, value), *rest = condition.items()
+            if rest:
+                break
+            if key == "source" and not isinstance(value, dict):
+                subset = snapshot.source_rows(value)
+                rows = subset if rows is None else np.intersect1d(rows, subset)
+            elif (
+                key in INDEXED_COLUMNS
+                and isinstance(value, dict)
+                and set(value) <= set(_RANGE_OPS)
+            ):
+                column = snapshot.columns[key]
+                candidates = rows
+                if candidates is None:
+                    candidates = snapshot.live_rows()
+                    if candidates is None:
+                        candidates = np.arange(snapshot.n, dtype=np.intp)
+                mask = np.ones(len(candidates), dtype=bool)
+                for op, operand in value.items():
+                    mask &= _RANGE_OPS[op](column[candidates], operand)
+                rows = candidates[mask]
+            else:
+                break
+        else:
+            if rows is None:
+                live = snapshot.live_rows()
+                return np.arange(snapshot.n, dtype=np.intp) if live is None else live
+            return rows
+        metadatas = snapshot.generation.metadatas if snapshot.n else []
+        return np.array(
+            [
+                n
+                for n in range(snapshot.n)
+                if snapshot.alive[n] and matches(metadatas[n], where)
+            ],
+            dtype=np.intp,
+        )
+
+    def count(self) -> int:
+        return self._snapshot().live
+
+    # -- writes ------------------------------------------------------------
+
+    @contextmanager
+    def _writing(self, dim: int = None):
+        """
+        Exclusive write access across threads and processes, on an up-to-date
+        generation (created on the first write, once `dim` is known).
+        """
+        with self._lock, file_lock(self.lock_path):
+            self._refresh()
+            if self._generation is None:
+                if dim is None:
+                    yield None
+                    return
+                self._start_generation(1, dim)
+            yield self._generation
+
+    def _start_generation(self, number: int, dim: int):
+        generation = _Generation(self.directory, number, dim, self.storage_dtype)
+        os.makedirs(self.directory, exist_ok=True)
+        for name in ("rows", "vectors", "documents"):
+            open(generation.paths[name], "wb").close()
+        self._write_current(number, dim, self.storage_dtype)
+        self._refresh()
+
+    @staticmethod
+    def _write_at(path: str, offset: int, data: bytes):
+        # Written at the committed end, over anything a crashed write left
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.seek(offset)
+            f.write(data)
+
+    def _append_codes(self, generation, start: int, vectors):
+        codes, scales = quantize_int8(vectors)
+        self._write_at(
+            generation.paths["codes"], start * generation.dim, codes.tobytes()
+        )
+        self._write_at(generation.paths["scales"], start * 4, scales.tobytes())
+
+    def _append_rows(self, generation, vectors, ids, texts, metadatas, deleted=()):
+        """
+        Append rows and tombstones to `generation`'s files. Data goes first and
+        the log line last: a row exists once its line is complete. Returns the
+        log record.
+        """
+        start = len(generation.ids)
+        if len(ids):
+            vectors = np.ascontiguousarray(vectors, dtype=generation.dtype)
+            self._write_at(
+                generation.paths["vectors"],
+                start * generation.dim * generation.dtype.itemsize,
+                vectors.tobytes(),
+            )
+            if self.quantized or os.path.exists(generation.paths["codes"]):
+                self._append_codes(generation, start, vectors)
+        spans, blobs, offset = [], [], generation.documents_end
+        for text in texts:
+            blob = text.encode("utf-8")
+            spans.append((offset, len(blob)))
+            blobs.append(blob)
+            offset += len(blob)
+        self._write_at(
+            generation.paths["documents"], generation.documents_end, b"".join(blobs)
+        )
+        record = {"ids": list(ids), "spans": spans, "metadatas": list(metadatas)}
+        if deleted:
+            record["deleted"] = sorted(deleted)
+        with open(generation.paths["rows"], "ab") as f:
+            f.write(json.dumps(record).encode("utf-8") + b"\n")
+        return record
+
+    def upsert_embeddings(self, ids, embeddings, texts, metadatas):
+        ids = list(ids)
+        if not ids:
+            return
+        new = np.asarray(embeddings, dtype=np.float32)
+        new /= np.maximum(np.linalg.norm(new, axis=1, keepdims=True), 1e-12)
+        # The last occurrence of an ID in one call wins
+        keep = sorted({doc_id: n for n, doc_id in enumerate(ids)}.values())
+
+        with self._writing(dim=new.shape[1]) as generation:
+            if new.shape[1] != generation.dim:
+                raise ValueError(
+                    f"Embedding dimension {new.shape[1]} does not match the "
+                    f"store's {generation.dim}"
+                )
+            # Replaced chunks get a new row; the old one becomes a tombstone
+            deleted = [
+                generation.positions[ids[n]]
+                for n in keep
+                if ids[n] in generation.positions
+            ]
+            self._append_rows(
+                generation,
+                new[keep],
+                [ids[n] for n in keep],
+                [texts[n] for n in keep],
+                [metadatas[n] or {} for n in keep],
+                deleted,
+            )
+            self._refresh()
+            self._maybe_compact()
+
+    def add_documents(self, documents, ids=None):
+        texts = [d.page_content for d in documents]
+        embeddings = self._embedding_function.embed_documents(texts)
+        self.upsert_embeddings(ids, embeddings, texts, [d.metadata for d in documents])
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        embeddings = self._embedding_function.embed_documents(texts)
+        self.upsert_embeddings(ids, embeddings, texts, metadatas)
+        return ids
+
+    def delete(self, ids=None):
+        with self._writing() as generation:
+            if generation is None:
+                return
+            deleted = {
+                generation.positions[doc_id]
+                for doc_id in ids or []
+                if doc_id in generation.positions
+            }
+            if deleted:
+                self._append_rows(generation, None, [], [], [], deleted)
+                self._refresh()
+                self._maybe_compact()
+
+    def _maybe_compact(self):
+        """
+        Rewrite the live rows into a new generation once tombstones outnumber
+        them. Called with the write lock held.
+        """
+        generation = self._generation
+        snapshot = self._snapshot_cache
+        dead = snapshot.n - snapshot.live
+        if dead < COMPACT_MIN_DEAD_ROWS or dead <= snapshot.live:
+            return
+        rows = snapshot.live_rows()
+        self._write_generation(
+            generation.number + 1,
+            generation.dim,
+            [generation.ids[n] for n in rows],
+            [generation.metadatas[n] for n in rows],
+            lambda block: generation.read_documents(rows[block]),
+            lambda block: snapshot.vectors[rows[block]],
+            len(rows),
+        )
+        for path in generation.paths.values():
+            try:
+                # Readers still holding the old maps and files keep them
+                os.remove(path)
+            except OSError:
+                pass
+        self._refresh()
+
+    def _write_generation(self, number, dim, ids, metadatas, texts, vectors, count):
+        """
+        Write `count` rows as generation `number` and make it current.
+        `texts` and `vectors` take a slice of row positions.
+        """
+        generation = _Generation(self.directory, number, dim, self.storage_dtype)
+        for path in generation.paths.values():
+            if os.path.exists(path):
+                os.remove(path)  # left by a crashed compaction
+        for name in ("rows", "vectors", "documents"):
+            open(generation.paths[name], "wb").close()
+        for start in range(0, count, COMPACT_BLOCK):
+            block = slice(start, min(start + COMPACT_BLOCK, count))
+            record = self._append_rows(
+                generation,
+                np.asarray(vectors(block), dtype=np.float32),
+                ids[block],
+                texts(block),
+                metadatas[block],
+            )
+            generation.apply(record)
+        self._write_current(number, dim, self.storage_dtype)
+
+    # -- reads -------------------------------------------------------------
+
+    def get(self, ids=None, include=("documents", "metadatas"), where=None):
+        snapshot = self._snapshot()
+        generation = snapshot.generation
+        if not snapshot.n:
+            return {
+                "ids": [],
+                "documents": [] if "documents" in include else None,
+                "metadatas": [] if "metadatas" in include else None,
+            }
+        if ids is not None:
+            rows = [generation.positions.get(i) for i in ids]
+            rows = [n for n in rows if snapshot.has_row(n)]
+        else:
+            live = snapshot.live_rows()
+            rows = range(snapshot.n) if live is None else live.tolist()
+        if where:
+            allowed = set(self.filter_rows(where, snapshot).tolist())
+            rows = [n for n in rows if n in allowed]
+        result = {"ids": [generation.ids[n] for n in rows]}
+        result["documents"] = (
+            generation.read_documents(rows) if "documents" in include else None
+        )
+        result["metadatas"] = (
+            [generation.metadatas[n] for n in rows] if "metadatas" in include else None
+        )
+        return result
+
+    @staticmethod
+    def _scores(vectors, query, rows=None):
+        vectors = vectors if rows is None else vectors[rows]
+        if vectors.dtype == np.float32:
+            return vectors @ query
+        scores = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), SCORE_BLOCK):
+            block = vectors[start : start + SCORE_BLOCK].astype(np.float32)
+            scores[start : start + SCORE_BLOCK] = block @ query
+        return scores
+
+    @staticmethod
+    def _approx_scores(snapshot, query, rows=None):
+        codes = snapshot.codes if rows is None else snapshot.codes[rows]
+        scales = snapshot.scales if rows is None else snapshot.scales[rows]
+        scores = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK):
+            block = codes[start : start + SCORE_BLOCK].astype(np.float32)
+            scores[start : start + SCORE_BLOCK] = block @ query
+        return scores * scales
+
+    def search_by_vector(self, embedding, k: int = 4, where: dict = None):
+        """
+        Cosine-similarity top-k; `distance` is 1 - cosine, as in Chroma's cosine space.
+        """
+        snapshot = self._snapshot()
+        if not snapshot.live or k <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+
+        rows = self.filter_rows(where, snapshot) if where else snapshot.live_rows()
+        if rows is not None and not len(rows):
+            return []
+        candidates = np.arange(snapshot.n) if rows is None else rows
+
+        if snapshot.codes is not None:
+            # Cheap int8 scan, then exact scores for the shortlist only
+            shortlist = top_k(
+                self._approx_scores(snapshot, query, rows), k * self.rerank_factor
+            )
+            candidates = candidates[shortlist]
+            scores = np.asarray(snapshot.vectors[candidates], dtype=np.float32) @ query
+        else:
+            scores = self._scores(snapshot.vectors, query, rows)
+
+        best = [int(candidates[n]) for n in top_k(scores, k)]
+        generation = snapshot.generation
+        return [
+            {
+                "id": generation.ids[row],
+                "text": text,
+                "metadata": generation.metadatas[row],
+                "distance": float(1.0 - scores[n]),
+            }
+            for n, row, text in zip(
+                top_k(scores, k), best, generation.read_documents(best)
+            )
+        ]
+
+    def quantization_report(self, queries=None, k: int = 10, sample: int = 100):
+        """
+        quantization_report() over this store's vectors. Without `queries`,
+        a sample of stored vectors (lightly perturbed) is used.
+        """
+        snapshot = self._snapshot()
+        live = snapshot.live_rows()
+        vectors = np.asarray(
+            snapshot.vectors if live is None else snapshot.vectors[live],
+            dtype=np.float32,
+        )
+        if queries is None:
+            rng = np.random.default_rng(0)
+            picked = rng.choice(len(vectors), min(sample, len(vectors)), replace=False)
+            queries = vectors[picked] + rng.normal(
+                0, 0.05, (len(picked), vectors.shape[1])
+            )
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        return quantization_report(vectors, queries, k, self.rerank_factor)
+
+    def search(self, query: str, k: int = 4, where: dict = None):
+        embedding = self._embedding_function.embed_query(query)
+        return self.search_by_vector(embedding, k, where)
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None):
+        return [
+            Document(page_content=hit["text"], metadata=hit["metadata"])
+            for hit in self.search(query, k, filter)
+        ]
+
+    def persist(self):
+        """
+        Writes are already durable; kept for API parity with Chroma.
+        """
@@ -0,0 +1,350 @@
+# agent/jobs.py
+"""
+Background job queue with a persistent job table.
+
+Jobs are rows in a SQLite table and run on a small thread pool, so a long
+ingestion no longer holds up the chat turn that asked for it. Handlers get
+a `progress` callback: each call stores the reported counts, and it is also
+where a cancellation takes effect. Failed jobs are retried with a doubling
+delay, and jobs a previous process left queued or running are picked up
+again on start. Jobs are claimed with a conditional update and cancelled
+through the table, so processes sharing one job table cooperate.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.metrics import JOBS
+from agent.tracing import span
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Errors another attempt will not fix
+PERMANENT_ERRORS = (FileNotFoundError, IsADirectoryError, TypeError, ValueError)
+
+# Finished jobs are dropped from the table after this long
+KEEP_FINISHED_SECONDS = 7 * 86400
+
+COLUMNS = (
+    "id",
+    "kind",
+    "arguments",
+    "status",
+    "progress",
+    "result",
+    "error",
+    "attempts",
+    "created_at",
+    "started_at",
+    "finished_at",
+)
+
+
+def _process_alive(owner: str) -> bool:
+    """
+    Whether the "host:pid" that claimed a job may still be running it.
+    Called on start, when this process has not claimed anything yet.
+    """
+    host, _, pid = (owner or "").rpartition(":")
+    if not pid.isdigit():
+        return False
+    if host != socket.gethostname():
+        return True  # can't tell from here
+    if int(pid) == os.getpid():
+        return False  # restarted with the same PID, e.g. in a container
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobCancelled(Exception):
+    """
+    Raised from the progress callback to stop a job.
+    """
+
+
+class _Interrupted(JobCancelled):
+    """
+    The queue is closing: the job goes back to the queue instead.
+    """
+
+
+def describe_progress(progress: dict):
+    """
+    (fraction done or None, short text) for a job's last progress report.
+    """
+    for done, total, unit in (
+        ("pages", "total_pages", "pages"),
+        ("embedded", "total_chunks", "chunks embedded"),
+        ("files", "total_files", "files parsed"),
+    ):
+        if progress.get(total):
+            fraction = min(1.0, progress.get(done, 0) / progress[total])
+            return fraction, f"{progress.get(done, 0)}/{progress[total]} {unit}"
+    return None, ""
+
+
+class JobQueue:
+    """
+    Runs jobs from a SQLite job table on a thread pool. `handlers` maps a job
+    kind to a callable taking the job's arguments plus `progress`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        handlers: dict,
+        workers: int = 2,
+        max_retries: int = 2,
+        retry_delay: float = 5.0,
+    ):
+        self.path = path
+        self.handlers = handlers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._timers = {}
+        self._closing = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, arguments TEXT NOT NULL, "
+            "status TEXT NOT NULL, progress TEXT NOT NULL DEFAULT '{}', "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "owner TEXT, cancel_requested INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)"
+        )
+        self._conn.commit()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="job"
+        )
+        # At interpreter exit concurrent.futures joins its workers before any
+        # atexit handler runs; this hook is registered later, so runs first
+        threading._register_atexit(self._interrupt)
+        self._recover()
+
+    def _update(self, job_id: str, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+            self._conn.commit()
+
+    def _recover(self):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                (*FINISHED, time.time() - KEEP_FINISHED_SECONDS),
+            )
+            # Jobs whose process died while running them start over
+            running = self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE status = ?", (RUNNING,)
+            ).fetchall()
+            for job_id, owner in running:
+                if not _process_alive(owner):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ? WHERE id = ?", (QUEUED, job_id)
+                    )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+            ).fetchall()
+        for (job_id,) in rows:
+            self._executor.submit(self._run, job_id)
+
+    def submit(self, kind: str, **arguments) -> str:
+        """
+        Queue a job and return its ID.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, arguments, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(arguments), QUEUED, time.time()),
+            )
+            self._conn.commit()
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(zip(COLUMNS, row))
+        job["arguments"] = json.loads(job["arguments"])
+        job["progress"] = json.loads(job["progress"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def get(self, job_id: str):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def recent(self, limit: int = 20, collection: str = None):
+        """
+        The latest jobs, newest first; with `collection`, only the jobs
+        whose arguments name that collection.
+        """
+        query, parameters = f"SELECT {', '.join(COLUMNS)} FROM jobs ", []
+        if collection is not None:
+            query += "WHERE json_extract(arguments, '$.collection') = ? "
+            parameters.append(collection)
+        with self._lock:
+            rows = self._conn.execute(
+                query + "ORDER BY created_at DESC LIMIT ?", (*parameters, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str, collection: str = None) -> bool:
+        """
+        Cancel a queued job now, or a running one at its next progress report.
+        False when the job is unknown, already finished or (with
+        `collection`) belongs to another collection.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, arguments FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None or row[0] in FINISHED:
+                return False
+            if (
+                collection is not None
+                and json.loads(row[1]).get("collection") != collection
+            ):
+                return False
+            if row[0] == RUNNING:
+                self._conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,)
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                    (CANCELLED, time.time(), job_id),
+                )
+                timer = self._timers.pop(job_id, None)
+                if timer is not None:
+                    timer.cancel()
+            self._conn.commit()
+        return True
+
+    def _run(self, job_id: str):
+        with self._lock:
+            if self._closing:
+                return
+            # Claim the job; another worker or process may have got it first
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, "
+                "started_at = ?, owner = ? WHERE id = ? AND status = ?",
+                (RUNNING, time.time(), self.owner, job_id, QUEUED),
+            ).rowcount
+            self._conn.commit()
+            if not claimed:
+                return
+            kind, arguments, attempts = self._conn.execute(
+                "SELECT kind, arguments, attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+
+        def progress(**counts):
+            if self._closing:
+                raise _Interrupted()
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE jobs SET progress = ? WHERE id = ?",
+                    (json.dumps(counts), job_id),
+                )
+                self._conn.commit()
+                (cancel,) = self._conn.execute(
+                    "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+            if cancel:
+                raise JobCancelled()
+
+        try:
+            with span("job", kind=kind, job_id=job_id, attempt=attempts):
+                result = self.handlers[kind](**json.loads(arguments), progress=progress)
+        except _Interrupted:
+            self._update(job_id, status=QUEUED)
+        except JobCancelled:
+            self._update(job_id, status=CANCELLED, finished_at=time.time())
+            JOBS.inc(kind=kind, status=CANCELLED)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if (
+                attempts <= self.max_retries
+                and not isinstance(e, PERMANENT_ERRORS)
+                and not self._closing
+            ):
+                self._update(job_id, status=QUEUED, error=error)
+                self._retry_later(job_id, self.retry_delay * 2 ** (attempts - 1))
+                JOBS.inc(kind=kind, status="retried")
+            else:
+                self._update(
+                    job_id, status=FAILED, error=error, finished_at=time.time()
+                )
+                JOBS.inc(kind=kind, status=FAILED)
+        else:
+            self._update(
+                job_id,
+                status=SUCCEEDED,
+                result=json.dumps(result),
+                error=None,
+                finished_at=time.time(),
+            )
+            JOBS.inc(kind=kind, status=SUCCEEDED)
+
+    def _retry_later(self, job_id: str, delay: float):
+        def resubmit():
+            with self._lock:
+                self._timers.pop(job_id, None)
+                if self._closing:
+                    return
+                self._executor.submit(self._run, job_id)
+
+        timer = threading.Timer(delay, resubmit)
+        timer.daemon = True
+        with self._lock:
+            self._timers[job_id] = timer
+        timer.start()
+
+    def _interrupt(self):
+        with self._lock:
+            self._closing = True
+            for timer in self._timers.values():
+                timer.cancel()
+            self._timers.clear()
+
+    def close(self):
+        """
+        Stop taking work. Running jobs stop at their next progress report
+        and stay queued for the next process.
+        """
+        self._interrupt()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,239 @@
+# agent/keyword_index.py
+"""
+In-process BM25 keyword index kept next to the vector store.
+
+Exact identifiers, error codes and names are matched lexically here, without
+a query embedding or a call into the vector store.
+
+Several processes can share one index file: each reloads it when another
+process saves, keeping its own unsaved changes, and `save` merges those
+changes into the latest file under a file lock instead of overwriting it.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from agent.file_lock import file_lock
+from agent.filters import conditions_of, matches
+
+# Keeps identifiers such as ERR-042, v1.2.3 or snake_case_names as one token
+TOKEN_RE = re.compile(r"[\w]+(?:[-.:/][\w]+)*")
+
+
+def tokenize(text: str):
+    return TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk texts, keyed by the same chunk IDs as the store.
+    """
+
+    def __init__(self, path: str = None, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+        self._version = None  # file version the index reflects
+        self._added = {}  # not yet saved: id -> (text, metadata)
+        self._removed = set()
+        self._sync()
+
+    def __len__(self):
+        self._sync()
+        return len(self._docs)
+
+    def _reset(self):
+        self._docs = {}  # id -> (text, metadata)
+        self._lengths = {}
+        self._postings = defaultdict(dict)  # term -> {id: term frequency}
+        self._by_source = defaultdict(set)  # source -> {id}
+        self._total_length = 0
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _sync(self):
+        """
+        Reload if another process saved the file since we last read or wrote
+        it, then re-apply this process's unsaved changes on top.
+        """
+        if not self.path or self._file_version() == self._version:
+            return
+        with self._lock:
+            version = self._file_version()
+            if version == self._version:
+                return
+            data = {}
+            if version is not None:
+                with open(self.path) as f:
+                    data = json.load(f)
+            self._reset()
+            for doc_id, (text, metadata) in data.items():
+                if doc_id not in self._removed:
+                    self._add(doc_id, text, metadata)
+            for doc_id, (text, metadata) in self._added.items():
+                self._add(doc_id, text, metadata)
+            self._version = version
+
+    def _add(self, doc_id, text, metadata):
+        if doc_id in self._docs:
+            self._remove(doc_id)
+        terms = Counter(tokenize(text))
+        self._docs[doc_id] = (text, metadata)
+        self._lengths[doc_id] = sum(terms.values())
+        self._total_length += self._lengths[doc_id]
+        self._by_source[metadata.get("source")].add(doc_id)
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+
+    def add(self, ids, texts, metadatas=None):
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            self._sync()
+            for doc_id, text, metadata in zip(ids, texts, metadatas):
+                self._add(doc_id, text, metadata)
+                self._added[doc_id] = (text, metadata)
+                self._removed.discard(doc_id)
+
+    def _remove(self, doc_id):
+        text, metadata = self._docs.pop(doc_id)
+        self._total_length -= self._lengths.pop(doc_id)
+        source_ids = self._by_source.get(metadata.get("source"))
+        if source_ids is not None:
+            source_ids.discard(doc_id)
+            if not source_ids:
+                del self._by_source[metadata.get("source")]
+        for term in set(tokenize(text)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def remove(self, ids):
+        with self._lock:
+            self._sync()
+            for doc_id in ids:
+                self._added.pop(doc_id, None)
+                self._removed.add(doc_id)
+                if doc_id in self._docs:
+                    self._remove(doc_id)
+
+    def search(self, query: str, k: int = 10, ids=None):
+        """
+        Return [(id, score), ...] best first. `ids` restricts the candidates.
+        """
+        self._sync()
+        with self._lock:
+            n = len(self._docs)
+            if not n:
+                return []
+            avg_length = self._total_length / n
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if ids is not None and doc_id not in ids:
+                        continue
+                    norm = self.k1 * (
+                        1 - self.b + self.b * self._lengths[doc_id] / avg_length
+                    )
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def filter_ids(self, where: dict):
+        """
+        IDs whose metadata matches `where`; a source condition narrows the
+        scan to that document's chunks first.
+        """
+        self._sync()
+        with self._lock:
+            candidates = self._docs.keys()
+            for condition in conditions_of(where):
+                source = condition.get("source")
+                if len(condition) == 1 and source is not None:
+                    if not isinstance(source, dict):
+                        candidates = self._by_source.get(source, set())
+                        break
+            return {
+                doc_id for doc_id in candidates if matches(self._docs[doc_id][1], where)
+            }
+
+    def get(self, doc_id):
+        """
+        Return (text, metadata) for a chunk ID, or None.
+        """
+        self._sync()
+        with self._lock:
+            return self._docs.get(doc_id)
+
+    def contains_term(self, doc_id, term: str) -> bool:
+        self._sync()
+        with self._lock:
+            return doc_id in self._postings.get(term.lower(), {})
+
+    def save(self):
+        """
+        Write this process's changes into the latest saved index.
+        """
+        if not self.path:
+            return
+        with file_lock(f"{self.path}.lock"):
+            with self._lock:
+                # Merge with whatever other processes saved in the meantime
+                self._sync()
+                data = {
+                    doc_id: [text, meta] for doc_id, (text, meta) in self._docs.items()
+                }
+                added, removed = dict(self._added), set(self._removed)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+            with self._lock:
+                self._version = self._file_version()
+                # Changes made while writing stay pending for the next save
+                for doc_id, entry in added.items():
+                    if self._added.get(doc_id) is entry:
+                        del self._added[doc_id]
+                self._removed -= removed
+
+
+def is_exact_match_query(query: str) -> bool:
+    """
+    Heuristic for queries that name an identifier (codes, versions, snake_case)
+    and are best answered lexically.
+    """
+    tokens = TOKEN_RE.findall(query)
+    return (
+        bool(tokens)
+        and len(tokens) <= 4
+        and any(
+            any(c.isdigit() for c in t) or "_" in t or (t.isupper() and len(t) > 1)
+            for t in tokens
+        )
+    )
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """
+    Fuse several ranked ID lists; returns [(id, score), ...] best first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
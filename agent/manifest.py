@@ -0,0 +1,127 @@
+# agent/manifest.py
+"""
+Record of ingested files kept alongside the vector store.
+
+Each entry maps an absolute file path to its content hash, mtime/size, the
+chunk IDs written for it and the embedding model used, which lets ingestion
+skip unchanged files, replace changed ones and drop removed ones. Like the
+keyword index, it reloads when another process saves and merges its own
+changes into the latest file on save.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from agent.file_lock import file_lock
+
+
+def file_hash(path: str) -> str:
+    """
+    SHA-256 of a file's bytes, read in blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IngestManifest:
+    """
+    JSON-backed manifest of ingested documents.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._version = None  # file version the entries reflect
+        self._changes = {}  # not yet saved: path -> entry, or None if removed
+        self._sync()
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _sync(self):
+        """
+        Reload if another process saved since we last read or wrote the
+        file, keeping this process's unsaved changes.
+        """
+        if self._file_version() == self._version:
+            return
+        with self._lock:
+            version = self._file_version()
+            if version == self._version:
+                return
+            entries = {}
+            if version is not None:
+                with open(self.path) as f:
+                    entries = json.load(f).get("files", {})
+            for path, entry in self._changes.items():
+                if entry is None:
+                    entries.pop(path, None)
+                else:
+                    entries[path] = entry
+            self._entries = entries
+            self._version = version
+
+    def get(self, file_path: str):
+        self._sync()
+        with self._lock:
+            return self._entries.get(os.path.abspath(file_path))
+
+    def paths(self):
+        self._sync()
+        with self._lock:
+            return list(self._entries)
+
+    def is_unchanged(self, file_path: str, model: str, stat=None) -> bool:
+        """
+        Cheap check on mtime and size, without reading the file.
+        """
+        entry = self.get(file_path)
+        if entry is None or entry["embedding_model"] != model:
+            return False
+        stat = stat or os.stat(file_path)
+        return entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size
+
+    def record(self, file_path: str, digest: str, chunk_ids, model: str, stat=None):
+        stat = stat or os.stat(file_path)
+        entry = {
+            "file_hash": digest,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "chunk_ids": list(chunk_ids),
+            "embedding_model": model,
+            "ingested_at": time.time(),
+        }
+        with self._lock:
+            self._sync()
+            self._entries[os.path.abspath(file_path)] = entry
+            self._changes[os.path.abspath(file_path)] = entry
+
+    def remove(self, file_path: str):
+        with self._lock:
+            self._sync()
+            self._changes[os.path.abspath(file_path)] = None
+            return self._entries.pop(os.path.abspath(file_path), None)
+
+    def save(self):
+        """
+        Write this process's changes into the latest saved manifest.
+        """
+        with file_lock(f"{self.path}.lock"), self._lock:
+            self._sync()
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"files": self._entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._version = self._file_version()
+            self._changes.clear()
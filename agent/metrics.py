@@ -0,0 +1,315 @@
+# agent/metrics.py
+"""
+Prometheus-style metrics for the chatbot.
+
+Counters and histograms are sharded per thread: a thread only ever updates
+its own shard, so the hot path takes no lock, and a scrape sums the shards.
+Numbers that are already kept elsewhere (cache hits, loaded collections) are
+read at scrape time by collector callbacks instead of being counted twice.
+`start_metrics_server` serves everything on /metrics in the text exposition
+format from a daemon thread.
+"""
+
+import bisect
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from agent.settings import METRICS_HOST, METRICS_PORT
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Base for sharded metrics. Each thread gets its own dict of
+    {label values: value}; shards of finished threads are folded into one.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # [(thread, shard)]
+        self._retired = {}
+        self._lock = threading.Lock()  # shard list only, never on updates
+
+    def _key(self, labels: dict):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                # Also fold in here: without scrapes, short-lived threads
+                # (UI reruns, HTTP requests) would pile up shards
+                self._retire_finished()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _merge(self, into: dict, shard: dict):
+        raise NotImplementedError
+
+    def _retire_finished(self):
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                # A finished thread can no longer write to its shard
+                self._merge(self._retired, shard)
+        self._shards = live
+
+    def _collect(self) -> dict:
+        with self._lock:
+            self._retire_finished()
+            total = {}
+            self._merge(total, self._retired)
+            for _, shard in self._shards:
+                self._merge(total, dict(shard))
+            return total
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, into, shard):
+        for key, value in shard.items():
+            into[key] = into.get(key, 0) + value
+
+    def samples(self):
+        for key, value in sorted(self._collect().items()):
+            yield self.name, _labels(self.labelnames, key), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        # Per-bucket (not cumulative) counts plus the sum, so the count is
+        # always consistent with the buckets even mid-update
+        counts = shard.get(key)
+        if counts is None:
+            counts = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, into, shard):
+        for key, counts in shard.items():
+            total = into.setdefault(key, [0] * len(counts))
+            for n, value in enumerate(list(counts)):
+                total[n] += value
+
+    def samples(self):
+        for key, counts in sorted(self._collect().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = [("le", _number(float(bound)))]
+                labels = _labels(self.labelnames, key, le)
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, counts[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    """
+    Named metrics plus collector callbacks. A collector returns
+    [(name, kind, documentation, [(labels dict, value), ...]), ...].
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(
+                    name, documentation, labelnames, **kwargs
+                )
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def expose(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        for collector in collectors:
+            try:
+                families = collector()
+            except Exception:
+                # A broken collector must not take the endpoint down
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {_escape(documentation)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    names = tuple(labels)
+                    text = _labels(names, [labels[n] for n in names])
+                    lines.append(f"{name}{text} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_CALLS = REGISTRY.counter("rag_tool_calls_total", "Tool calls.", ["tool"])
+TOOL_ERRORS = REGISTRY.counter(
+    "rag_tool_errors_total", "Tool calls that failed or timed out.", ["tool"]
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "rag_tool_duration_seconds", "Tool call latency.", ["tool"]
+)
+RETRIEVAL_SECONDS = REGISTRY.histogram(
+    "rag_retrieval_duration_seconds", "fn_retrieve latency by mode.", ["mode"]
+)
+INGEST_SECONDS = REGISTRY.histogram(
+    "rag_ingest_duration_seconds", "Ingest latency per call.", ["tool"]
+)
+INGEST_PAGES = REGISTRY.counter("rag_ingest_pages_total", "Pages ingested.")
+INGEST_CHUNKS = REGISTRY.counter(
+    "rag_ingest_chunks_total", "Chunks processed by ingestion (new and unchanged)."
+)
+INGEST_EMBEDDED_CHUNKS = REGISTRY.counter(
+    "rag_ingest_embedded_chunks_total", "New chunks embedded and written."
+)
+TURNS = REGISTRY.counter("rag_chat_turns_total", "Chat turns.", ["cached"])
+TURN_SECONDS = REGISTRY.histogram(
+    "rag_chat_turn_duration_seconds", "Chat turn latency.", ["cached"]
+)
+TIME_TO_FIRST_TOKEN = REGISTRY.histogram(
+    "rag_chat_time_to_first_token_seconds", "Time to the first answer token."
+)
+COMPLETIONS = REGISTRY.counter("rag_llm_completions_total", "Chat completion requests.")
+TOKENS = REGISTRY.counter(
+    "rag_llm_tokens_total", "Tokens reported by the API.", ["direction"]
+)
+TURN_TOKENS = REGISTRY.histogram(
+    "rag_chat_turn_tokens",
+    "Tokens per chat turn, all completions of the turn.",
+    ["direction"],
+    buckets=TOKEN_BUCKETS,
+)
+JOBS = REGISTRY.counter(
+    "rag_jobs_total",
+    "Background job attempts by outcome (succeeded, failed, cancelled, retried).",
+    ["kind", "status"],
+)
+
+API_REJECTED = REGISTRY.counter(
+    "rag_api_rejected_total",
+    "API requests turned away with 503 because the endpoint was at capacity.",
+    ["route"],
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.expose().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(
+    port: int = METRICS_PORT, host: str = METRICS_HOST, registry: Registry = None
+):
+    """
+    Serve /metrics from a daemon thread, once per process. Returns the
+    server, or None when disabled (port 0) or the port is taken.
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"⚠️ Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            _server.daemon_threads = True
+            _server.registry = registry or REGISTRY
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
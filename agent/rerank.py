@@ -0,0 +1,151 @@
+# agent/rerank.py
+"""
+Second retrieval stage: re-score an over-fetched candidate list, then pick a
+diverse top-k with maximal marginal relevance (MMR).
+
+Re-scoring runs under a latency budget; if the scorer does not finish in
+time the first-stage scores are used instead, so a slow model never stalls
+a chat turn.
+"""
+
+import math
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from agent.keyword_index import tokenize
+from agent.settings import (
+    CROSS_ENCODER_MODEL,
+    MMR_LAMBDA,
+    RERANK_BUDGET_MS,
+    RERANK_CANDIDATES,
+)
+
+# Scoring runs off the caller's thread so the budget can be enforced
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rerank")
+
+
+class LexicalReranker:
+    """
+    Query/chunk term overlap, idf-weighted over the candidate set, plus a
+    bonus for query bigrams that appear verbatim. Scores the whole batch at
+    once; no model to load.
+    """
+
+    def score(self, query: str, texts):
+        terms = tokenize(query)
+        if not terms or not texts:
+            return [0.0] * len(texts)
+        bigrams = set(zip(terms, terms[1:]))
+        docs = [tokenize(text) for text in texts]
+        doc_terms = [set(doc) for doc in docs]
+
+        df = Counter(term for doc in doc_terms for term in set(terms) & doc)
+        n = len(texts)
+        idf = {term: math.log(1 + (n + 1) / (df[term] + 0.5)) for term in set(terms)}
+        total = sum(idf.values())
+
+        scores = []
+        for doc, present in zip(docs, doc_terms):
+            coverage = sum(w for term, w in idf.items() if term in present) / total
+            phrase = (
+                len(bigrams & set(zip(doc, doc[1:]))) / len(bigrams) if bigrams else 0
+            )
+            scores.append(coverage + 0.5 * phrase)
+        return scores
+
+
+class CrossEncoderReranker:
+    """
+    Local sentence-transformers cross-encoder, scored in batches on CPU.
+    """
+
+    def __init__(self, model: str = CROSS_ENCODER_MODEL, batch_size: int = 32):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "RERANKER=cross-encoder requires: pip install sentence-transformers"
+            ) from e
+
+        self.model = CrossEncoder(model, device="cpu")
+        self.batch_size = batch_size
+
+    def score(self, query: str, texts):
+        pairs = [(query, text) for text in texts]
+        return self.model.predict(pairs, batch_size=self.batch_size).tolist()
+
+
+def create_reranker(name: str):
+    """
+    Build the re-ranker named by RERANKER, or None when disabled.
+    """
+    if name in ("", "none"):
+        return None
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "cross-encoder":
+        return CrossEncoderReranker()
+    raise ValueError(f"Unknown RERANKER: {name}")
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def normalize(scores):
+    low, high = min(scores), max(scores)
+    if high - low < 1e-12:
+        return [1.0] * len(scores)
+    return [(s - low) / (high - low) for s in scores]
+
+
+def mmr(hits, scores, k: int, lambda_: float = MMR_LAMBDA):
+    """
+    Greedy MMR over token-set Jaccard similarity. Returns indexes into `hits`.
+    """
+    relevance = normalize(scores)
+    tokens = [set(tokenize(hit["text"])) for hit in hits]
+    selected, remaining = [], list(range(len(hits)))
+    while remaining and len(selected) < k:
+        best = max(
+            remaining,
+            key=lambda i: lambda_ * relevance[i]
+            - (1 - lambda_)
+            * max((jaccard(tokens[i], tokens[j]) for j in selected), default=0.0),
+        )
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def rerank(
+    query: str,
+    hits,
+    k: int,
+    reranker=None,
+    budget_ms: float = RERANK_BUDGET_MS,
+    lambda_: float = MMR_LAMBDA,
+):
+    """
+    Re-score first-stage `hits` (best first, each with a "score") and return
+    the MMR-diversified top-k with their final scores.
+    """
+    if not hits:
+        return []
+    scores = [hit["score"] for hit in hits]
+    if reranker is not None and len(hits) > 1:
+        future = _executor.submit(reranker.score, query, [h["text"] for h in hits])
+        try:
+            scores = future.result(timeout=budget_ms / 1000)
+        except FutureTimeout:
+            # Over budget: keep the first-stage scores
+            future.cancel()
+    return [{**hits[i], "score": scores[i]} for i in mmr(hits, scores, k, lambda_)]
+
+
+def candidate_count(k: int) -> int:
+    """
+    How many first-stage candidates to fetch for a final top-k.
+    """
+    return max(RERANK_CANDIDATES, 2 * k)
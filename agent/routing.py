@@ -0,0 +1,29 @@
+# agent/routing.py
+"""
+Cheap local classification of user messages, used to decide whether a turn
+should retrieve before the model is called.
+"""
+
+import re
+
+SMALL_TALK_RE = re.compile(
+    r"^\s*(hi|hello|hey|thanks|thank you|thx|bye|goodbye|ok|okay|cool|great|"
+    r"good (morning|afternoon|evening))\b[\s!.?]*$",
+    re.IGNORECASE,
+)
+
+# Requests to load documents: the model will call an ingest tool instead
+INGEST_RE = re.compile(
+    r"^\s*(please\s+)?(ingest|upload|load|index|add)\b|\.pdf\b", re.IGNORECASE
+)
+
+
+def needs_retrieval(message: str) -> bool:
+    """
+    True for messages that look like questions about the documents; False
+    for small talk and ingest requests.
+    """
+    text = message.strip()
+    if len(text) < 3 or SMALL_TALK_RE.match(text):
+        return False
+    return not INGEST_RE.search(text)
@@ -0,0 +1,136 @@
+# agent/settings.py
+"""
+Runtime settings shared by the agent tools.
+
+Values come from the environment (or .env), see README "Configuration".
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "./store")
+
+# Named collections: how many stay loaded, and after how long idle they unload
+MAX_LOADED_COLLECTIONS = int(os.getenv("MAX_LOADED_COLLECTIONS", "8"))
+COLLECTION_IDLE_SECONDS = float(os.getenv("COLLECTION_IDLE_SECONDS", "900"))
+
+# Vector store: "chroma" or "flat" (memory-mapped NumPy, FLAT_STORE_DTYPE
+# float32, float16 or int8; int8 re-ranks FLAT_RERANK_FACTOR * k candidates)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "chroma")
+FLAT_STORE_DTYPE = os.getenv("FLAT_STORE_DTYPE", "float32")
+FLAT_RERANK_FACTOR = int(os.getenv("FLAT_RERANK_FACTOR", "4"))
+
+# Embedding backend: "openai", "hashing" (local, offline), "sentence-transformers"
+# or "fake" (deterministic, for tests and benchmarks)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "384"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+DEFAULT_EMBEDDING_MODELS = {
+    "openai": "text-embedding-ada-002",
+    "hashing": f"hashing-{EMBEDDING_DIM}",
+    "sentence-transformers": "all-MiniLM-L6-v2",
+    "fake": f"fake-{EMBEDDING_DIM}",
+}
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL") or DEFAULT_EMBEDDING_MODELS.get(
+    EMBEDDING_BACKEND, "text-embedding-ada-002"
+)
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+# Query-embedding cache (QUERY_CACHE_PATH enables persistence across restarts)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH") or None
+
+# Content-addressed cache of chunk embeddings, reused across re-ingests
+CHUNK_CACHE_PATH = os.getenv(
+    "CHUNK_CACHE_PATH", os.path.join(VECTOR_DB_PATH, "chunk_embeddings.sqlite")
+)
+
+# Bulk directory ingestion
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", "2000"))
+
+# Streaming ingestion: chunks embedded and flushed to the store per window
+INGEST_WINDOW_SIZE = int(os.getenv("INGEST_WINDOW_SIZE", "256"))
+
+# Semantic answer cache for repeated standalone questions (0 disables it)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "512"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Background ingestion: the fn_ingest tools queue a job and return its ID
+# instead of blocking the chat turn. Jobs live in a SQLite table, run on
+# JOB_WORKERS threads and are retried up to JOB_MAX_RETRIES times, waiting
+# JOB_RETRY_DELAY seconds (doubling) between attempts.
+INGEST_IN_BACKGROUND = os.getenv("INGEST_IN_BACKGROUND", "true").lower() != "false"
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(VECTOR_DB_PATH, "jobs.sqlite"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "2"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+
+# Tool execution: calls in one model turn run concurrently with these timeouts
+TOOL_WORKERS = int(os.getenv("TOOL_WORKERS", "8"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "60"))
+INGEST_TOOL_TIMEOUT = float(os.getenv("INGEST_TOOL_TIMEOUT", "600"))
+
+# Chat loop: follow-up completions allowed after tool calls in a single turn
+MAX_TOOL_ROUNDS = int(os.getenv("MAX_TOOL_ROUNDS", "3"))
+
+# Tracing: per-stage spans; also appended to this JSONL file when set
+TRACE_PATH = os.getenv("TRACE_PATH") or None
+
+# Metrics: Prometheus text format on http://METRICS_HOST:METRICS_PORT/metrics
+# (METRICS_PORT=0 disables the endpoint; metrics are still collected)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# Eager RAG: retrieve for the user's message before the first completion
+# and send the chunks with it, saving the round trip that requests them
+EAGER_RETRIEVAL = os.getenv("EAGER_RETRIEVAL", "false").lower() in ("1", "true", "yes")
+
+# Pooled HTTP connections for the OpenAI client
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+
+# Prompt budgeting: history beyond the budget is summarized, then dropped.
+# CONTEXT_BUDGETS overrides per model, e.g. "gpt-4o=16000,gpt-4o-mini=8000"
+CONTEXT_BUDGET = int(os.getenv("CONTEXT_BUDGET", "12000"))
+CONTEXT_BUDGETS = {
+    model.strip(): int(budget)
+    for model, _, budget in (
+        item.partition("=") for item in os.getenv("CONTEXT_BUDGETS", "").split(",")
+    )
+    if model.strip() and budget.strip()
+}
+KEEP_RECENT_TURNS = int(os.getenv("KEEP_RECENT_TURNS", "4"))
+
+# Retrieval: "hybrid" (BM25 + vector, rank-fused), "vector" or "keyword"
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+
+# Second stage: re-rank RERANK_CANDIDATES first-stage hits ("lexical",
+# "cross-encoder" or "none") within RERANK_BUDGET_MS, then diversify with MMR
+RERANKER = os.getenv("RERANKER", "lexical")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "200"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+CROSS_ENCODER_MODEL = os.getenv(
+    "CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+)
+
+# HTTP API (api/server.py): requests in flight per endpoint; beyond that a
+# request waits up to API_QUEUE_TIMEOUT seconds for a slot, then gets a 503.
+# Blocking work runs on at most API_THREADS worker threads.
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_MAX_CHATS = int(os.getenv("API_MAX_CHATS", "16"))
+API_MAX_RETRIEVALS = int(os.getenv("API_MAX_RETRIEVALS", "32"))
+API_MAX_INGESTS = int(os.getenv("API_MAX_INGESTS", "2"))
+API_QUEUE_TIMEOUT = float(os.getenv("API_QUEUE_TIMEOUT", "1"))
+API_THREADS = int(os.getenv("API_THREADS", "64"))
+# /ingest only reads files under this directory
+API_INGEST_ROOT = os.getenv("API_INGEST_ROOT", "data")
@@ -0,0 +1,486 @@
+# agent/store.py
+"""
+Process-wide pool of vector stores and embedding clients.
+
+Opening Chroma re-reads the SQLite/HNSW files and every embedding client
+holds its own HTTP session or model, so both are created once per
+(persist directory, embedding model) and shared by fn_ingest and fn_retrieve.
+Each embedding model keeps its vectors apart (`model_store_name`), so
+switching models or dimensions re-embeds instead of mixing vectors.
+
+Each named collection is its own persist directory. Collections are opened
+on first use and the least recently used ones are unloaded again, so memory
+follows the active collections rather than everything on disk. Collections
+with an ingest or search in progress (`collection_in_use`) stay loaded.
+"""
+
+import atexit
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from langchain_community.vectorstores import Chroma
+
+from agent.answer_cache import SemanticAnswerCache
+from agent.embedding_cache import (
+    CachedEmbeddings,
+    ChunkEmbeddingCache,
+    QueryEmbeddingCache,
+)
+from agent.embeddings import create_embeddings
+from agent.flat_store import FlatVectorStore
+from agent.keyword_index import BM25Index
+from agent.manifest import IngestManifest
+from agent.metrics import REGISTRY
+from agent.rerank import create_reranker
+from agent.settings import (
+    ANSWER_CACHE_SIZE,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL,
+    CHUNK_CACHE_PATH,
+    COLLECTION_IDLE_SECONDS,
+    EMBEDDING_MODEL,
+    FLAT_RERANK_FACTOR,
+    FLAT_STORE_DTYPE,
+    MAX_LOADED_COLLECTIONS,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_TTL,
+    RERANKER,
+    VECTOR_DB_PATH,
+    VECTOR_STORE,
+)
+
+_lock = threading.RLock()
+_embeddings = {}
+_stores = {}
+_manifests = {}
+_keyword_indexes = {}
+_rerankers = {}
+_answer_cache = None
+_collections = OrderedDict()  # loaded collection directory -> last used
+_in_use = Counter()  # collection directory -> tool calls using it
+
+DEFAULT_COLLECTION = "default"
+COLLECTION_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+# Stores from before vectors were kept per model hold this model's vectors
+# in LangChain's default Chroma collection
+LEGACY_EMBEDDING_MODEL = "text-embedding-ada-002"
+_query_cache = None
+_chunk_cache = None
+
+
+class ChromaStore(Chroma):
+    """
+    Chroma plus the operations the tools need beyond the LangChain API:
+    writing precomputed embeddings and searches that return chunk IDs.
+    """
+
+    def count(self) -> int:
+        return self._collection.count()
+
+    def upsert_embeddings(self, ids, embeddings, texts, metadatas):
+        """
+        Write precomputed embeddings straight to the store, bypassing re-embedding.
+        """
+        self._collection.upsert(
+            ids=list(ids),
+            embeddings=list(embeddings),
+            documents=list(texts),
+            metadatas=list(metadatas),
+        )
+
+    def search(self, query: str, k: int = 4, where: dict = None):
+        """
+        Vector search returning [{"id", "text", "metadata", "distance"}, ...].
+        """
+        embedding = self._embedding_function.embed_query(query)
+        return self.search_by_vector(embedding, k, where)
+
+    def close(self):
+        """
+        Stop Chroma's System for this directory. Chroma caches one per path for
+        the life of the process, so dropping the store alone frees nothing.
+        """
+        client = self._client
+        if hasattr(client, "close"):
+            client.close()  # stops the System once its last client closes
+            return
+        system = type(client)._identifier_to_system.pop(client._identifier, None)
+        if system is not None:
+            system.stop()
+
+    def search_by_vector(self, embedding, k: int = 4, where: dict = None):
+        result = self._collection.query(
+            query_embeddings=[embedding],
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas", "distances"],
+        )
+        return [
+            {"id": i, "text": text, "metadata": metadata or {}, "distance": distance}
+            for i, text, metadata, distance in zip(
+                result["ids"][0],
+                result["documents"][0],
+                result["metadatas"][0],
+                result["distances"][0],
+            )
+        ]
+
+
+def collection_path(collection: str = None) -> str:
+    """
+    Directory of a named collection. The default collection is VECTOR_DB_PATH
+    itself (so existing stores keep working); others live in
+    VECTOR_DB_PATH/collections/<name>.
+    """
+    if not collection or collection == DEFAULT_COLLECTION:
+        return os.path.abspath(VECTOR_DB_PATH)
+    if not COLLECTION_NAME_RE.match(collection):
+        raise ValueError(f"Invalid collection name: {collection!r}")
+    return os.path.abspath(os.path.join(VECTOR_DB_PATH, "collections", collection))
+
+
+def list_collections():
+    """
+    Names of the default collection and every collection on disk.
+    """
+    root = os.path.join(VECTOR_DB_PATH, "collections")
+    names = sorted(os.listdir(root)) if os.path.isdir(root) else []
+    return [DEFAULT_COLLECTION] + [
+        name
+        for name in names
+        if COLLECTION_NAME_RE.match(name) and os.path.isdir(os.path.join(root, name))
+    ]
+
+
+def _store_key(persist_directory=None, model=None):
+    return (
+        os.path.abspath(persist_directory or VECTOR_DB_PATH),
+        model or EMBEDDING_MODEL,
+    )
+
+
+def model_store_name(model: str) -> str:
+    """
+    Chroma collection (and flat store subdirectory) holding `model`'s vectors.
+    """
+    if model == LEGACY_EMBEDDING_MODEL:
+        return Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME
+    return "chunks-" + re.sub(r"[^A-Za-z0-9]+", "-", model).strip("-")
+
+
+def _unload(directory) -> bool:
+    if _in_use[directory]:
+        # An ingest may hold its manifest and index; a reload would fork them
+        return False
+    for key in [key for key in _stores if key[0] == directory]:
+        store = _stores.pop(key)
+        if hasattr(store, "close"):
+            store.close()
+    _manifests.pop(directory, None)
+    _keyword_indexes.pop(directory, None)
+    _collections.pop(directory, None)
+    return True
+
+
+@contextmanager
+def collection_in_use(persist_directory: str = None):
+    """
+    Keep a collection loaded for the duration of the block.
+    """
+    directory = _store_key(persist_directory)[0]
+    with _lock:
+        _in_use[directory] += 1
+    try:
+        yield directory
+    finally:
+        with _lock:
+            _in_use[directory] -= 1
+            if not _in_use[directory]:
+                del _in_use[directory]
+
+
+def _touch(directory):
+    """
+    Mark a collection as used and unload the least recently used ones beyond
+    MAX_LOADED_COLLECTIONS or idle for COLLECTION_IDLE_SECONDS. Unloaded
+    collections are re-opened lazily on their next use.
+    """
+    now = time.monotonic()
+    with _lock:
+        _collections[directory] = now
+        _collections.move_to_end(directory)
+        for other, last_used in list(_collections.items()):
+            if other == directory:
+                continue
+            if (
+                len(_collections) > MAX_LOADED_COLLECTIONS
+                or now - last_used > COLLECTION_IDLE_SECONDS
+            ):
+                _unload(other)
+
+
+def unload_collection(collection: str = None) -> bool:
+    """
+    Drop a collection's store, manifest and keyword index from memory.
+    False when it is in use and was kept.
+    """
+    with _lock:
+        return _unload(collection_path(collection))
+
+
+def get_query_cache():
+    """
+    Return the process-wide query-embedding cache.
+    """
+    global _query_cache
+    if _query_cache is not None:
+        return _query_cache
+
+    with _lock:
+        if _query_cache is None:
+            _query_cache = QueryEmbeddingCache(
+                max_entries=QUERY_CACHE_SIZE,
+                ttl_seconds=QUERY_CACHE_TTL,
+                path=QUERY_CACHE_PATH,
+            )
+        return _query_cache
+
+
+def get_chunk_cache():
+    """
+    Return the process-wide content-addressed chunk embedding cache.
+    """
+    global _chunk_cache
+    if _chunk_cache is not None:
+        return _chunk_cache
+
+    with _lock:
+        if _chunk_cache is None:
+            _chunk_cache = ChunkEmbeddingCache(CHUNK_CACHE_PATH)
+        return _chunk_cache
+
+
+def get_answer_cache():
+    """
+    Return the process-wide semantic answer cache, or None when disabled.
+    """
+    global _answer_cache
+    if _answer_cache is not None or ANSWER_CACHE_SIZE <= 0:
+        return _answer_cache
+
+    with _lock:
+        if _answer_cache is None:
+            _answer_cache = SemanticAnswerCache(
+                max_entries=ANSWER_CACHE_SIZE,
+                ttl_seconds=ANSWER_CACHE_TTL,
+                threshold=ANSWER_CACHE_THRESHOLD,
+            )
+        return _answer_cache
+
+
+def _corpus_version_path(persist_directory=None):
+    return os.path.join(
+        os.path.abspath(persist_directory or VECTOR_DB_PATH), "corpus_version"
+    )
+
+
+def corpus_version(persist_directory: str = None) -> int:
+    """
+    Counter bumped whenever ingestion changes the stored chunks. Kept in a
+    file so every process sharing the store sees the change.
+    """
+    try:
+        with open(_corpus_version_path(persist_directory)) as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_corpus_version(persist_directory: str = None) -> int:
+    path = _corpus_version_path(persist_directory)
+    with _lock:
+        version = corpus_version(persist_directory) + 1
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(version))
+        os.replace(tmp_path, path)
+    return version
+
+
+def get_reranker(name: str = None):
+    """
+    Return the shared second-stage re-ranker, or None when disabled.
+    """
+    name = RERANKER if name is None else name
+    if name in _rerankers:
+        return _rerankers[name]
+
+    with _lock:
+        if name not in _rerankers:
+            _rerankers[name] = create_reranker(name)
+        return _rerankers[name]
+
+
+def get_embeddings(model: str = None):
+    """
+    Return the shared (cached) embedding client for `model`.
+    """
+    model = model or EMBEDDING_MODEL
+    embeddings = _embeddings.get(model)
+    if embeddings is not None:
+        return embeddings
+
+    with _lock:
+        if model not in _embeddings:
+            _embeddings[model] = CachedEmbeddings(
+                create_embeddings(model),
+                model,
+                get_query_cache(),
+                get_chunk_cache(),
+            )
+        return _embeddings[model]
+
+
+def get_vectordb(persist_directory: str = None, model: str = None):
+    """
+    Return the shared vector store for `persist_directory` and `model`:
+    a ChromaStore, or a FlatVectorStore when VECTOR_STORE=flat.
+    """
+    key = _store_key(persist_directory, model)
+    _touch(key[0])
+    vectordb = _stores.get(key)
+    if vectordb is not None:
+        return vectordb
+
+    with _lock:
+        if key not in _stores:
+            if VECTOR_STORE == "flat":
+                _stores[key] = FlatVectorStore(
+                    os.path.join(key[0], "vectors", model_store_name(key[1])),
+                    get_embeddings(key[1]),
+                    dtype=FLAT_STORE_DTYPE,
+                    rerank_factor=FLAT_RERANK_FACTOR,
+                )
+            else:
+                _stores[key] = ChromaStore(
+                    collection_name=model_store_name(key[1]),
+                    persist_directory=key[0],
+                    embedding_function=get_embeddings(key[1]),
+                )
+        return _stores[key]
+
+
+def get_manifest(persist_directory: str = None):
+    """
+    Return the shared ingest manifest stored next to `persist_directory`.
+    """
+    directory = _store_key(persist_directory)[0]
+    _touch(directory)
+    manifest = _manifests.get(directory)
+    if manifest is not None:
+        return manifest
+
+    with _lock:
+        if directory not in _manifests:
+            _manifests[directory] = IngestManifest(
+                os.path.join(directory, "manifest.json")
+            )
+        return _manifests[directory]
+
+
+def get_keyword_index(persist_directory: str = None):
+    """
+    Return the shared BM25 index stored next to `persist_directory`, building
+    it from the vector store the first time for stores ingested without one.
+    """
+    directory = _store_key(persist_directory)[0]
+    _touch(directory)
+    index = _keyword_indexes.get(directory)
+    if index is not None:
+        return index
+
+    with _lock:
+        if directory not in _keyword_indexes:
+            path = os.path.join(directory, "keyword_index.json")
+            index = BM25Index(path)
+            if not os.path.exists(path):
+                stored = get_vectordb(directory).get(include=["documents", "metadatas"])
+                if stored["ids"]:
+                    index.add(stored["ids"], stored["documents"], stored["metadatas"])
+                    index.save()
+            _keyword_indexes[directory] = index
+        return _keyword_indexes[directory]
+
+
+def warm_up(persist_directory: str = None, model: str = None):
+    """
+    Open the store ahead of the first query so it does not pay for loading the index.
+    """
+    vectordb = get_vectordb(persist_directory, model)
+    vectordb.count()
+    return vectordb
+
+
+def _cache_metrics():
+    """
+    Scrape-time metrics from the pooled caches' own hit counters.
+    """
+    caches = {
+        "query_embedding": _query_cache,
+        "chunk_embedding": _chunk_cache,
+        "answer": _answer_cache,
+    }
+    stats = {name: c.stats() for name, c in caches.items() if c is not None}
+    return [
+        (
+            "rag_cache_hits_total",
+            "counter",
+            "Cache hits.",
+            [({"cache": name}, s["hits"]) for name, s in stats.items()],
+        ),
+        (
+            "rag_cache_misses_total",
+            "counter",
+            "Cache misses.",
+            [({"cache": name}, s["misses"]) for name, s in stats.items()],
+        ),
+        (
+            "rag_loaded_collections",
+            "gauge",
+            "Collections currently open.",
+            [({}, len(_collections))],
+        ),
+    ]
+
+
+REGISTRY.register_collector(_cache_metrics)
+
+
+def shutdown():
+    """
+    Release every pooled store and embedding client, saving the query cache.
+    """
+    global _query_cache, _chunk_cache, _answer_cache
+    with _lock:
+        _answer_cache = None
+        if _query_cache is not None:
+            _query_cache.save()
+            _query_cache = None
+        if _chunk_cache is not None:
+            _chunk_cache.close()
+            _chunk_cache = None
+        _stores.clear()
+        _manifests.clear()
+        _keyword_indexes.clear()
+        _collections.clear()
+        _embeddings.clear()
+        _rerankers.clear()
+
+
+atexit.register(shutdown)
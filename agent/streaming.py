@@ -0,0 +1,87 @@
+# agent/streaming.py
+"""
+Helpers for streamed Chat Completions.
+"""
+
+import time
+from types import SimpleNamespace
+
+
+class StreamedCompletion:
+    """
+    Wrap a `stream=True` chat completion.
+
+    Iterating yields text deltas as they arrive. Tool-call deltas are
+    assembled by index into complete tool calls (`.id`, `.type`,
+    `.function.name`, `.function.arguments`), so they can be dispatched once
+    the stream ends. Timings are measured from `started` (defaults to now).
+    """
+
+    def __init__(self, stream, started: float = None):
+        self.stream = stream
+        self.started = time.perf_counter() if started is None else started
+        self.content = ""
+        self.finish_reason = None
+        self.usage = None
+        self.first_token_at = None
+        self.finished_at = None
+        self._tool_calls = {}
+
+    def __iter__(self):
+        for chunk in self.stream:
+            if chunk.usage is not None:
+                self.usage = chunk.usage
+            if not chunk.choices:
+                continue
+
+            choice = chunk.choices[0]
+            delta = choice.delta
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+
+            for tc in delta.tool_calls or []:
+                call = self._tool_calls.setdefault(
+                    tc.index,
+                    SimpleNamespace(
+                        id=None,
+                        type="function",
+                        function=SimpleNamespace(name="", arguments=""),
+                    ),
+                )
+                if tc.id:
+                    call.id = tc.id
+                if tc.function is not None:
+                    call.function.name += tc.function.name or ""
+                    call.function.arguments += tc.function.arguments or ""
+
+            if delta.content:
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                self.content += delta.content
+                yield delta.content
+
+        self.finished_at = time.perf_counter()
+
+    def consume(self):
+        """
+        Drain the stream without rendering it; returns the full text.
+        """
+        for _ in self:
+            pass
+        return self.content
+
+    @property
+    def tool_calls(self):
+        return [self._tool_calls[index] for index in sorted(self._tool_calls)]
+
+    @property
+    def time_to_first_token(self):
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def total_time(self):
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started
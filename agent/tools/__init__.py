@@ -4,6 +4,7 @@ RAG Agent tools package initialization.
 """
 
 from agent.tools.fn_ingest import fn_ingest
+from agent.tools.fn_ingest_directory import fn_ingest_directory
 from agent.tools.fn_retrieve import fn_retrieve
 
-__all__ = ["fn_ingest", "fn_retrieve"]
+__all__ = ["fn_ingest", "fn_ingest_directory", "fn_retrieve"]
@@ -0,0 +1,177 @@
+# agent/tools/dispatcher.py
+"""
+Concurrent execution of the model's tool calls.
+
+All tool calls from one model turn are submitted to a shared thread pool, so
+several independent fn_retrieve calls cost one round trip instead of the sum.
+"""
+
+import contextvars
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from agent.metrics import TOOL_CALLS, TOOL_ERRORS, TOOL_SECONDS
+from agent.settings import (
+    INGEST_IN_BACKGROUND,
+    INGEST_TOOL_TIMEOUT,
+    TOOL_TIMEOUT,
+    TOOL_WORKERS,
+)
+from agent.tools.fn_ingest import fn_ingest
+from agent.tools.fn_ingest_directory import fn_ingest_directory
+from agent.tools.fn_jobs import (
+    fn_cancel_job,
+    fn_ingest_background,
+    fn_ingest_directory_background,
+    fn_job_status,
+)
+from agent.tools.fn_retrieve import fn_retrieve
+from agent.tracing import span
+
+TOOLS = {
+    "fn_ingest": fn_ingest,
+    "fn_ingest_directory": fn_ingest_directory,
+    "fn_retrieve": fn_retrieve,
+    "fn_job_status": fn_job_status,
+    "fn_cancel_job": fn_cancel_job,
+}
+if INGEST_IN_BACKGROUND:
+    # Ingest tools queue a job and return its ID instead of blocking the turn
+    TOOLS["fn_ingest"] = fn_ingest_background
+    TOOLS["fn_ingest_directory"] = fn_ingest_directory_background
+
+TOOL_TIMEOUTS = {
+    "fn_ingest": INGEST_TOOL_TIMEOUT,
+    "fn_ingest_directory": INGEST_TOOL_TIMEOUT,
+}
+
+# Tools scoped to a collection by bind_collection
+COLLECTION_TOOLS = {
+    "fn_ingest",
+    "fn_ingest_directory",
+    "fn_retrieve",
+    "fn_job_status",
+    "fn_cancel_job",
+}
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+
+
+def run_tool(name: str, arguments: str, tools: dict = None):
+    """
+    Execute one tool by name with JSON-encoded arguments.
+    """
+    tool = (TOOLS if tools is None else tools).get(name)
+    if tool is None:
+        TOOL_ERRORS.inc(tool="unknown")
+        return {"error": f"Unknown tool: {name}"}
+    TOOL_CALLS.inc(tool=name)
+    started = time.perf_counter()
+    with span(f"tool.{name}") as tool_span:
+        try:
+            args = json.loads(arguments or "{}")
+            return tool(**args)
+        except Exception as e:
+            tool_span.record_error(e)
+            TOOL_ERRORS.inc(tool=name)
+            return {"error": f"{name} failed: {e}"}
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - started, tool=name)
+
+
+def _submit(name: str, arguments: str, tools: dict = None):
+    # Run in a copy of the caller's context so tool spans nest under its span
+    context = contextvars.copy_context()
+    return _executor.submit(context.run, run_tool, name, arguments, tools)
+
+
+def bind_collection(tools: dict, collection: str):
+    """
+    Tool registry pinned to one collection: whatever collection the model
+    passes, collection-aware tools only see `collection`.
+    """
+
+    def bind(tool):
+        def bound(**arguments):
+            arguments["collection"] = collection
+            return tool(**arguments)
+
+        return bound
+
+    return {
+        name: bind(tool) if name in COLLECTION_TOOLS else tool
+        for name, tool in tools.items()
+    }
+
+
+def prefetch_tool(name: str, arguments: dict, tools: dict = None):
+    """
+    Start one tool call in the shared pool before the model asks for it.
+    Returns a Future resolving to the same result run_tool would return.
+    """
+    return _submit(name, json.dumps(arguments), tools)
+
+
+def dispatch_tool_calls(
+    tool_calls, timeout: float = None, cancel_event=None, tools: dict = None
+):
+    """
+    Run `tool_calls` concurrently and return [(tool_call, result), ...] in order.
+
+    `tools` maps tool names to callables and defaults to TOOLS.
+
+    Each call gets its own deadline (`timeout`, or the per-tool default). Calls
+    that miss it, or are still pending when `cancel_event` is set, are reported
+    as errors and the model turn is not held up by them. Calls that have not
+    started yet are cancelled; a call already running can't be interrupted and
+    finishes in the background, holding its worker until then.
+    """
+    tool_calls = list(tool_calls)
+    started = time.monotonic()
+    futures = {}
+    deadlines = {}
+    for tool_call in tool_calls:
+        name = tool_call.function.name
+        future = _submit(name, tool_call.function.arguments, tools)
+        futures[future] = tool_call
+        deadlines[future] = started + (timeout or TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT))
+
+    results = {}
+    pending = set(futures)
+    try:
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            now = time.monotonic()
+            for future in [f for f in pending if deadlines[f] <= now]:
+                pending.discard(future)
+                if future.done():
+                    results[future] = future.result()
+                    continue
+                future.cancel()
+                name = futures[future].function.name
+                TOOL_ERRORS.inc(tool=name)
+                results[future] = {"error": f"{name} timed out"}
+            if not pending:
+                break
+            wait_for = min(deadlines[f] for f in pending) - now
+            if cancel_event is not None:
+                wait_for = min(wait_for, 0.1)
+            done, pending = wait(
+                pending, timeout=max(wait_for, 0), return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                results[future] = future.result()
+    except BaseException:
+        # e.g. KeyboardInterrupt: don't start the calls still queued
+        for future in pending:
+            future.cancel()
+        raise
+
+    for future in pending:
+        future.cancel()
+        TOOL_ERRORS.inc(tool=futures[future].function.name)
+        results[future] = {"error": f"{futures[future].function.name} was cancelled"}
+
+    return [(tool_call, results[future]) for future, tool_call in futures.items()]
@@ -1,29 +1,244 @@
 # agent/tools/fn_ingest.py
+import os
+import time
+from collections import Counter
+
 from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
+from agent.embedding_cache import content_hash
+from agent.manifest import file_hash
+from agent.metrics import (
+    INGEST_CHUNKS,
+    INGEST_EMBEDDED_CHUNKS,
+    INGEST_PAGES,
+    INGEST_SECONDS,
+)
+from agent.settings import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    EMBEDDING_MODEL,
+    INGEST_WINDOW_SIZE,
+)
+from agent.store import (
+    bump_corpus_version,
+    collection_in_use,
+    collection_path,
+    get_embeddings,
+    get_keyword_index,
+    get_manifest,
+    get_vectordb,
+)
+from agent.tracing import span
+
 
-def fn_ingest(file_path: str):
+def chunk_ids(chunks, model: str = EMBEDDING_MODEL, seen: Counter = None):
     """
-    Ingest documents: load → chunk → embed → store in Chroma DB.
+    Content-addressed IDs: the same chunk text from the same source always
+    maps to the same ID, so re-ingesting never inserts duplicates.
+
+    Pass the same `seen` counter across calls when IDs are assigned in windows.
     """
+    seen = Counter() if seen is None else seen
+    ids = []
+    for chunk in chunks:
+        text = f"{chunk.metadata.get('source', '')}\x00{chunk.page_content}"
+        key = content_hash(text)
+        seen[key] += 1
+        ids.append(content_hash(f"{text}\x00{seen[key]}", model))
+    return ids
 
-    loader = PyPDFLoader(file_path)
-    docs = loader.load()
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    chunks = splitter.split_documents(docs)
+def load_and_split(file_path: str):
+    """
+    Load a PDF and split it into chunks. Returns (page count, chunks).
+    """
+    docs = PyPDFLoader(os.path.abspath(file_path)).load()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    return len(docs), splitter.split_documents(docs)
 
-    vectordb = Chroma.from_documents(
-        documents=chunks, embedding=OpenAIEmbeddings(), persist_directory="./store"
+
+def iter_chunk_windows(file_path: str, window_size: int = INGEST_WINDOW_SIZE):
+    """
+    Lazily read pages and yield (pages read, chunks) in windows of at most
+    `window_size` chunks, so memory does not grow with the document.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
     )
+    window, pages = [], 0
+    # Absolute `source` metadata, however the file was named to the tool
+    for page in PyPDFLoader(os.path.abspath(file_path)).lazy_load():
+        pages += 1
+        window.extend(splitter.split_documents([page]))
+        while len(window) >= window_size:
+            yield pages, window[:window_size]
+            window = window[window_size:]
+    if window or not pages:
+        yield pages, window
+
+
+def count_pages(file_path: str) -> int:
+    """
+    Page count from the PDF's page tree, without extracting any text.
+    """
+    from pypdf import PdfReader
+
+    return len(PdfReader(file_path).pages)
+
+
+def prune_removed_files(collection: str = None):
+    """
+    Delete the chunks of every manifest entry whose file no longer exists.
+    """
+    store_dir = collection_path(collection)
+    manifest = get_manifest(store_dir)
+    vectordb = get_vectordb(store_dir)
+    keyword_index = get_keyword_index(store_dir)
+
+    removed = [path for path in manifest.paths() if not os.path.exists(path)]
+    for path in removed:
+        entry = manifest.remove(path)
+        if entry["chunk_ids"]:
+            vectordb.delete(ids=entry["chunk_ids"])
+            keyword_index.remove(entry["chunk_ids"])
+
+    if removed:
+        keyword_index.save()
+        manifest.save()
+        bump_corpus_version(store_dir)
+    return removed
+
+
+def fn_ingest(file_path: str, collection: str = None, progress=None):
+    """
+    Ingest documents: load → chunk → embed → store in Chroma DB.
+
+    Documents go into the named `collection` (the default one when omitted).
+
+    Files whose hash matches the manifest are skipped. For changed files only
+    new chunks are embedded and written, and chunks that disappeared from the
+    file are deleted. Pages are streamed and each window of chunks is flushed
+    to the store before the next is read.
+
+    `progress`, when given, is called with keyword counts before each window
+    (see agent/jobs.py); it may raise to stop the run, in which case the
+    chunks written so far are removed again.
+    """
+
+    started = time.perf_counter()
+    store_dir = collection_path(collection)
+    with collection_in_use(store_dir), span(
+        "ingest", file=file_path, collection=collection or "default"
+    ) as root:
+        manifest = get_manifest(store_dir)
+        stat = os.stat(file_path)
+        if manifest.is_unchanged(file_path, EMBEDDING_MODEL, stat):
+            root.set(status="skipped")
+            return {
+                "status": "skipped",
+                "message": f"Already ingested: {file_path}",
+                "chunks": len(manifest.get(file_path)["chunk_ids"]),
+            }
+
+        with span("ingest.hash"):
+            digest = file_hash(file_path)
+        previous = manifest.get(file_path)
+        if (
+            previous
+            and previous["file_hash"] == digest
+            and previous["embedding_model"] == EMBEDDING_MODEL
+        ):
+            # Touched but not modified: refresh mtime so the next check is cheap
+            manifest.record(
+                file_path, digest, previous["chunk_ids"], EMBEDDING_MODEL, stat
+            )
+            manifest.save()
+            root.set(status="skipped")
+            return {
+                "status": "skipped",
+                "message": f"Already ingested: {file_path}",
+                "chunks": len(previous["chunk_ids"]),
+            }
+
+        vectordb = get_vectordb(store_dir)
+        embeddings = get_embeddings()
+        keyword_index = get_keyword_index(store_dir)
+        ids, seen, new_chunks, pages = [], Counter(), 0, 0
+        total_pages = count_pages(file_path) if progress is not None else None
+        ingested_at = time.time()
+        windows = iter_chunk_windows(file_path)
+        written = []
+        try:
+            while True:
+                if progress is not None:
+                    progress(
+                        pages=pages,
+                        total_pages=total_pages,
+                        chunks=len(ids),
+                        new_chunks=new_chunks,
+                    )
+                # Pages are read lazily, so parsing happens as windows are pulled
+                with span("ingest.parse_split"):
+                    window = next(windows, None)
+                if window is None:
+                    break
+                pages, chunks = window
+                window_ids = chunk_ids(chunks, seen=seen)
+                ids.extend(window_ids)
+                if not window_ids:
+                    continue
+
+                with span("ingest.lookup", chunks=len(window_ids)):
+                    existing = set(vectordb.get(ids=window_ids, include=[])["ids"])
+                new = [(i, c) for i, c in zip(window_ids, chunks) if i not in existing]
+                if not new:
+                    continue
+
+                new_ids, docs = [i for i, _ in new], [c for _, c in new]
+                texts = [d.page_content for d in docs]
+                metadatas = [{**d.metadata, "ingested_at": ingested_at} for d in docs]
+                with span("ingest.embed", chunks=len(texts)):
+                    vectors = embeddings.embed_documents(texts)
+                with span("ingest.write", chunks=len(texts)):
+                    vectordb.upsert_embeddings(new_ids, vectors, texts, metadatas)
+                    written.extend(new_ids)
+                with span("ingest.keyword_index", chunks=len(texts)):
+                    keyword_index.add(new_ids, texts, metadatas)
+                new_chunks += len(new)
+        except BaseException:
+            # Stopped part-way: the manifest is not updated, so take this
+            # run's chunks out again rather than leave them unaccounted for
+            if written:
+                vectordb.delete(ids=written)
+                keyword_index.remove(written)
+            raise
+
+        stale = set(previous["chunk_ids"]) - set(ids) if previous else set()
+        if stale:
+            with span("ingest.delete_stale", chunks=len(stale)):
+                vectordb.delete(ids=list(stale))
+                keyword_index.remove(stale)
 
-    vectordb.persist()
+        with span("ingest.save"):
+            keyword_index.save()
+            manifest.record(file_path, digest, ids, EMBEDDING_MODEL, stat)
+            manifest.save()
+        if new_chunks or stale:
+            bump_corpus_version(store_dir)
 
-    return {
-        "status": "success",
-        "message": f"Ingested: {file_path}",
-        "chunks": len(chunks),
-    }
+        root.set(status="success", pages=pages, chunks=len(ids), new_chunks=new_chunks)
+        INGEST_PAGES.inc(pages)
+        INGEST_CHUNKS.inc(len(ids))
+        INGEST_EMBEDDED_CHUNKS.inc(new_chunks)
+        INGEST_SECONDS.observe(time.perf_counter() - started, tool="fn_ingest")
+        return {
+            "status": "success",
+            "message": f"Ingested: {file_path}",
+            "pages": pages,
+            "chunks": len(ids),
+            "new_chunks": new_chunks,
+            "removed_chunks": len(stale),
+        }
@@ -0,0 +1,197 @@
+# agent/tools/fn_ingest_directory.py
+import glob
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from agent.manifest import file_hash
+from agent.metrics import (
+    INGEST_CHUNKS,
+    INGEST_EMBEDDED_CHUNKS,
+    INGEST_PAGES,
+    INGEST_SECONDS,
+)
+from agent.settings import (
+    EMBED_BATCH_SIZE,
+    EMBED_CONCURRENCY,
+    EMBEDDING_MODEL,
+    INGEST_WORKERS,
+    WRITE_BATCH_SIZE,
+)
+from agent.store import (
+    bump_corpus_version,
+    collection_in_use,
+    collection_path,
+    get_embeddings,
+    get_keyword_index,
+    get_manifest,
+    get_vectordb,
+)
+from agent.tools.fn_ingest import chunk_ids, load_and_split, prune_removed_files
+
+
+def parse_file(file_path: str):
+    """
+    Process-pool worker: hash, load and split one PDF. A file that can't be
+    parsed comes back with its error instead of failing the whole run.
+    """
+    try:
+        pages, chunks = load_and_split(file_path)
+        return file_path, file_hash(file_path), pages, chunks, None
+    except Exception as e:
+        return file_path, None, 0, [], f"{type(e).__name__}: {e}"
+
+
+def batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def fn_ingest_directory(
+    directory: str = "data",
+    pattern: str = "*.pdf",
+    workers: int = INGEST_WORKERS,
+    embed_batch_size: int = EMBED_BATCH_SIZE,
+    embed_concurrency: int = EMBED_CONCURRENCY,
+    collection: str = None,
+    progress=None,
+):
+    """
+    Bulk-ingest every matching file in `directory`.
+
+    PDFs are parsed and split in a process pool, new chunks are embedded in
+    concurrent batches and written to the store in large upserts. Unchanged
+    files are skipped via the manifest and chunks of deleted files are removed.
+
+    `progress`, when given, is called with keyword counts after each parsed
+    file and embedded batch; it may raise to stop the run before anything
+    is written.
+    """
+
+    started = time.perf_counter()
+    store_dir = collection_path(collection)
+    with collection_in_use(store_dir):
+        manifest = get_manifest(store_dir)
+        vectordb = get_vectordb(store_dir)
+        embeddings = get_embeddings()
+        keyword_index = get_keyword_index(store_dir)
+
+        removed_files = prune_removed_files(collection)
+        files = sorted(
+            glob.glob(os.path.join(directory, "**", pattern), recursive=True)
+        )
+        stats = {path: os.stat(path) for path in files}
+        pending = [
+            path
+            for path in files
+            if not manifest.is_unchanged(path, EMBEDDING_MODEL, stats[path])
+        ]
+
+        parsed = []
+        if pending:
+            # Spawned, not forked: this process runs job, tool and API threads
+            with ProcessPoolExecutor(
+                max_workers=max(1, min(workers, len(pending))),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                try:
+                    for result in pool.map(parse_file, pending):
+                        parsed.append(result)
+                        if progress is not None:
+                            progress(files=len(parsed), total_files=len(pending))
+                except BaseException:
+                    pool.shutdown(cancel_futures=True)
+                    raise
+        parse_seconds = time.perf_counter() - started
+
+        pages = chunks_total = 0
+        new_ids, new_chunks, stale_ids, skipped = [], [], [], len(files) - len(pending)
+        # Manifest entries are recorded only once their chunks are written
+        records = []
+        failed_files = []
+        for path, digest, page_count, chunks, error in parsed:
+            if error is not None:
+                # Left out of the manifest, so the next run tries it again
+                failed_files.append({"path": path, "error": error})
+                continue
+            previous = manifest.get(path)
+            ids = chunk_ids(chunks)
+            if (
+                previous
+                and previous["file_hash"] == digest
+                and previous["embedding_model"] == EMBEDDING_MODEL
+            ):
+                records.append((path, digest, previous["chunk_ids"]))
+                skipped += 1
+                continue
+
+            pages += page_count
+            chunks_total += len(chunks)
+            existing = set(vectordb.get(ids=ids, include=[])["ids"]) if ids else set()
+            for chunk_id, chunk in zip(ids, chunks):
+                if chunk_id not in existing:
+                    new_ids.append(chunk_id)
+                    new_chunks.append(chunk)
+            if previous:
+                stale_ids.extend(set(previous["chunk_ids"]) - set(ids))
+            records.append((path, digest, ids))
+
+        texts = [chunk.page_content for chunk in new_chunks]
+        vectors = []
+        with ThreadPoolExecutor(max_workers=max(1, embed_concurrency)) as pool:
+            try:
+                for batch_vectors in pool.map(
+                    embeddings.embed_documents, batched(texts, max(1, embed_batch_size))
+                ):
+                    vectors.extend(batch_vectors)
+                    if progress is not None:
+                        progress(embedded=len(vectors), total_chunks=len(texts))
+            except BaseException:
+                pool.shutdown(cancel_futures=True)
+                raise
+
+        ingested_at = time.time()
+        metadatas = [
+            {**chunk.metadata, "ingested_at": ingested_at} for chunk in new_chunks
+        ]
+        for start in range(0, len(new_ids), WRITE_BATCH_SIZE):
+            end = start + WRITE_BATCH_SIZE
+            vectordb.upsert_embeddings(
+                new_ids[start:end],
+                vectors[start:end],
+                texts[start:end],
+                metadatas[start:end],
+            )
+        keyword_index.add(new_ids, texts, metadatas)
+        if stale_ids:
+            vectordb.delete(ids=stale_ids)
+            keyword_index.remove(stale_ids)
+        for path, digest, ids in records:
+            manifest.record(path, digest, ids, EMBEDDING_MODEL, stats[path])
+        keyword_index.save()
+        manifest.save()
+        if new_ids or stale_ids:
+            bump_corpus_version(store_dir)
+
+        seconds = time.perf_counter() - started
+        INGEST_PAGES.inc(pages)
+        INGEST_CHUNKS.inc(chunks_total)
+        INGEST_EMBEDDED_CHUNKS.inc(len(new_ids))
+        INGEST_SECONDS.observe(seconds, tool="fn_ingest_directory")
+        return {
+            "status": "success",
+            "message": f"Ingested directory: {directory}",
+            "files": len(files),
+            "skipped_files": skipped,
+            "removed_files": len(removed_files),
+            "failed_files": failed_files,
+            "pages": pages,
+            "chunks": chunks_total,
+            "new_chunks": len(new_ids),
+            "removed_chunks": len(stale_ids),
+            "parse_seconds": round(parse_seconds, 3),
+            "seconds": round(seconds, 3),
+            "pages_per_second": round(pages / seconds, 2) if seconds else 0.0,
+            "chunks_per_second": round(chunks_total / seconds, 2) if seconds else 0.0,
+        }
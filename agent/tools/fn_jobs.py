@@ -0,0 +1,139 @@
+# agent/tools/fn_jobs.py
+"""
+Background ingestion tools: queue fn_ingest / fn_ingest_directory runs on
+the job queue (agent/jobs.py) and report on them, so the chat turn that
+asks for an ingest returns immediately with a job ID.
+"""
+
+import atexit
+import os
+import threading
+
+from agent.jobs import JobQueue, describe_progress
+from agent.settings import JOB_DB_PATH, JOB_MAX_RETRIES, JOB_RETRY_DELAY, JOB_WORKERS
+from agent.store import DEFAULT_COLLECTION, collection_path
+from agent.tools.fn_ingest import fn_ingest
+from agent.tools.fn_ingest_directory import fn_ingest_directory
+
+JOB_HANDLERS = {
+    "fn_ingest": fn_ingest,
+    "fn_ingest_directory": fn_ingest_directory,
+}
+
+_queue = None
+_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Return the process-wide job queue, recovering unfinished jobs on first use.
+    """
+    global _queue
+    if _queue is not None:
+        return _queue
+
+    with _lock:
+        if _queue is None:
+            _queue = JobQueue(
+                JOB_DB_PATH,
+                JOB_HANDLERS,
+                workers=JOB_WORKERS,
+                max_retries=JOB_MAX_RETRIES,
+                retry_delay=JOB_RETRY_DELAY,
+            )
+            atexit.register(_queue.close)
+        return _queue
+
+
+def job_summary(job: dict) -> dict:
+    """
+    What a caller needs to know about a job, with progress as text.
+    """
+    fraction, text = describe_progress(job["progress"])
+    summary = {
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "progress": text,
+        "attempts": job["attempts"],
+    }
+    if fraction is not None:
+        summary["percent"] = round(fraction * 100)
+    if job["error"]:
+        summary["error"] = job["error"]
+    if job["result"]:
+        summary["result"] = job["result"]
+    return summary
+
+
+def submit_job(kind: str, collection: str = None, **arguments) -> str:
+    """
+    Queue a `kind` job for `collection`, named in full so jobs can be
+    listed and cancelled per collection.
+    """
+    collection_path(collection)  # reject bad names before queueing
+    return get_job_queue().submit(
+        kind, collection=collection or DEFAULT_COLLECTION, **arguments
+    )
+
+
+def fn_ingest_background(file_path: str, collection: str = None):
+    """
+    Queue fn_ingest for `file_path` and return the job ID without waiting.
+    """
+    if not os.path.isfile(file_path):
+        return {"status": "error", "message": f"File not found: {file_path}"}
+    job_id = submit_job("fn_ingest", collection, file_path=os.path.abspath(file_path))
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "message": f"Ingesting {file_path} in the background (job {job_id})",
+    }
+
+
+def fn_ingest_directory_background(directory: str = "data", collection: str = None):
+    """
+    Queue fn_ingest_directory for `directory` and return the job ID.
+    """
+    if not os.path.isdir(directory):
+        return {"status": "error", "message": f"Directory not found: {directory}"}
+    job_id = submit_job(
+        "fn_ingest_directory", collection, directory=os.path.abspath(directory)
+    )
+    return {
+        "status": "queued",
+        "job_id": job_id,
+        "message": f"Ingesting {directory} in the background (job {job_id})",
+    }
+
+
+def fn_job_status(job_id: str = None, collection: str = None):
+    """
+    Status and progress of one ingestion job, or of the latest ones; with
+    `collection`, only that collection's jobs are visible.
+    """
+    queue = get_job_queue()
+    if not job_id:
+        return {
+            "status": "success",
+            "jobs": [
+                job_summary(job) for job in queue.recent(10, collection=collection)
+            ],
+        }
+    job = queue.get(job_id)
+    if job is None or (
+        collection is not None and job["arguments"].get("collection") != collection
+    ):
+        return {"status": "error", "message": f"Unknown job: {job_id}"}
+    return {"status": "success", "job": job_summary(job)}
+
+
+def fn_cancel_job(job_id: str, collection: str = None):
+    """
+    Cancel a queued or running ingestion job (of `collection`, when given).
+    A running ingest stops before its next window and its partial chunks
+    are removed.
+    """
+    if get_job_queue().cancel(job_id, collection=collection):
+        return {"status": "success", "message": f"Cancelling job {job_id}"}
+    return {"status": "error", "message": f"No unfinished job {job_id}"}
@@ -1,17 +1,142 @@
 # agent/tools/fn_retrieve.py
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
+import os
+import time
 
+from agent.filters import build_where
+from agent.keyword_index import (
+    TOKEN_RE,
+    is_exact_match_query,
+    reciprocal_rank_fusion,
+)
+from agent.metrics import RETRIEVAL_SECONDS
+from agent.rerank import candidate_count, rerank
+from agent.settings import RETRIEVAL_MODE
+from agent.store import (
+    collection_in_use,
+    collection_path,
+    get_embeddings,
+    get_keyword_index,
+    get_reranker,
+    get_vectordb,
+)
+from agent.tracing import span
 
-def fn_retrieve(query: str, k: int = 3):
+
+def keyword_search(query: str, k: int, where: dict = None, store_dir: str = None):
+    keyword_index = get_keyword_index(store_dir)
+    ids = keyword_index.filter_ids(where) if where else None
+    hits = []
+    for doc_id, score in keyword_index.search(query, k, ids=ids):
+        text, metadata = keyword_index.get(doc_id)
+        hits.append({"id": doc_id, "text": text, "metadata": metadata, "score": score})
+    return hits
+
+
+def exact_hits(query: str, hits, store_dir: str = None):
+    """
+    Keyword hits that contain every identifier-like token of the query.
+    """
+    keyword_index = get_keyword_index(store_dir)
+    terms = [t for t in TOKEN_RE.findall(query) if is_exact_match_query(t)]
+    return [
+        hit
+        for hit in hits
+        if terms and all(keyword_index.contains_term(hit["id"], t) for t in terms)
+    ]
+
+
+def format_chunk(hit, score: float):
     """
-    Retrieve most relevant text chunks using vector search.
+    Chunk as returned to the model: text plus where it came from.
     """
+    metadata = hit.get("metadata") or {}
+    page = metadata.get("page")
+    return {
+        "id": hit["id"],
+        "text": hit["text"],
+        "source": metadata.get("source"),
+        "page": page + 1 if isinstance(page, int) else page,
+        "score": round(float(score), 4),
+    }
+
+
+def fn_retrieve(
+    query: str,
+    k: int = 3,
+    mode: str = RETRIEVAL_MODE,
+    source: str = None,
+    page_start: int = None,
+    page_end: int = None,
+    ingested_after: str = None,
+    collection: str = None,
+):
+    """
+    Retrieve most relevant text chunks using vector search, BM25 keyword
+    search, or both fused with reciprocal-rank fusion ("hybrid").
+
+    Candidates are over-fetched, re-ranked and diversified with MMR (see
+    agent/rerank.py) before the top k are returned.
+
+    Optional filters restrict the search to one source file, a 1-based page
+    range, or chunks ingested after an ISO date; they are applied inside the
+    stores rather than on the returned top-k. Only the named `collection`
+    (the default one when omitted) is searched.
+    """
+
+    started = time.perf_counter()
+    k = int(k)
+    where = build_where(source, page_start, page_end, ingested_after)
+    depth = candidate_count(k)
+    store_dir = collection_path(collection)
+    if not os.path.isdir(store_dir):
+        # Nothing ingested into this collection; don't create it by searching
+        return {"chunks": []}
 
-    vectordb = Chroma(
-        persist_directory="./store", embedding_function=OpenAIEmbeddings()
-    )
+    with collection_in_use(store_dir), span(
+        "retrieve", mode=mode, k=k, collection=collection or "default"
+    ) as root:
+        if mode == "keyword":
+            with span("retrieve.keyword"):
+                hits = keyword_search(query, depth, where, store_dir)
+        else:
+            vectordb = get_vectordb(store_dir)
+            hits = None
+            if mode != "vector":
+                with span("retrieve.keyword"):
+                    keyword_hits = keyword_search(query, depth, where, store_dir)
+                # Identifier lookups answered lexically need no query embedding
+                if is_exact_match_query(query):
+                    exact = exact_hits(query, keyword_hits, store_dir)
+                    if len(exact) >= k:
+                        hits = exact[:k]
+                        root.set(exact_match=True)
 
-    docs = vectordb.similarity_search(query, k=k)
+            if hits is None:
+                with span("retrieve.embed_query"):
+                    embedding = get_embeddings().embed_query(query)
+                with span("retrieve.vector_search"):
+                    # Chroma and flat-store distances both shrink with similarity
+                    vector_hits = [
+                        {**hit, "score": 1 / (1 + hit["distance"])}
+                        for hit in vectordb.search_by_vector(embedding, depth, where)
+                    ]
+                if mode == "vector":
+                    hits = vector_hits
+                else:
+                    with span("retrieve.fusion"):
+                        by_id = {hit["id"]: hit for hit in keyword_hits + vector_hits}
+                        fused = reciprocal_rank_fusion(
+                            [
+                                [hit["id"] for hit in keyword_hits],
+                                [hit["id"] for hit in vector_hits],
+                            ]
+                        )
+                        hits = [
+                            {**by_id[i], "score": score} for i, score in fused[:depth]
+                        ]
 
-    return {"chunks": [d.page_content for d in docs]}
+        with span("retrieve.rerank", candidates=len(hits)):
+            hits = rerank(query, hits, k, get_reranker())
+        root.set(chunks=len(hits))
+    RETRIEVAL_SECONDS.observe(time.perf_counter() - started, mode=mode)
+    return {"chunks": [format_chunk(hit, hit["score"]) for hit in hits]}
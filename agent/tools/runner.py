@@ -1,8 +1,6 @@
 # agent/runner.py
-import json
 import os
 import sys
-import time
 from pathlib import Path
 
 # Add project root to Python path
@@ -14,11 +12,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-from openai import OpenAI
-
-from agent.agent_config import create_rag_agent
-from agent.tools.fn_ingest import fn_ingest
-from agent.tools.fn_retrieve import fn_retrieve
+from agent.chat import ChatEngine
+from agent.metrics import start_metrics_server
+from agent.store import shutdown, warm_up
 
 
 def run_agent():
@@ -31,67 +27,47 @@ def run_agent():
         print("  export OPENAI_API_KEY=your_key_here")
         sys.exit(1)
 
-    client = OpenAI()
-    agent = create_rag_agent()
+    engine = ChatEngine()
+    warm_up()
+    start_metrics_server()
 
     print("Agent Ready 🚀")
 
-    thread = client.beta.threads.create()  # conversation thread
-
     while True:
         user_msg = input("You: ")
 
         if user_msg.lower() in ["exit", "quit", "bye"]:
             print("Goodbye!")
+            shutdown()
             break
 
-        client.beta.threads.messages.create(
-            thread_id=thread.id, role="user", content=user_msg
-        )
-
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id, assistant_id=agent.id
-        )
+        def show_tool_calls(tool_calls):
+            for tool_call in tool_calls:
+                print(f"\n🔧 Calling tool: {tool_call.function.name}")
+            print("Bot: ", end="", flush=True)
+
+        turn = engine.ask(user_msg, on_tool_calls=show_tool_calls)
+
+        # Print the response as it streams in
+        print("Bot: ", end="", flush=True)
+        try:
+            for token in turn:
+                print(token, end="", flush=True)
+        except KeyboardInterrupt:
+            print("\n⏹️  Interrupted")
+            continue
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
+            continue
 
-        # Poll for response
-        while True:
-            status = client.beta.threads.runs.retrieve(
-                thread_id=thread.id, run_id=run.id
+        print()
+        if turn.cached:
+            print("⚡ Answered from cache")
+        elif turn.time_to_first_token is not None:
+            print(
+                f"⏱️  first token {turn.time_to_first_token:.2f}s"
+                f" · total {turn.total_time:.2f}s"
             )
-
-            if status.status == "completed":
-                break
-            elif status.status == "requires_action":
-                tool_outputs = []
-                for tool_call in status.required_action.submit_tool_outputs.tool_calls:
-                    name = tool_call.function.name
-                    args = json.loads(tool_call.function.arguments)
-
-                    print(f"🔧 Calling tool: {name}")
-
-                    if name == "fn_ingest":
-                        result = fn_ingest(**args)
-                    elif name == "fn_retrieve":
-                        result = fn_retrieve(**args)
-                    else:
-                        result = {"error": "Unknown tool"}
-
-                    tool_outputs.append(
-                        {"tool_call_id": tool_call.id, "output": json.dumps(result)}
-                    )
-
-                client.beta.threads.runs.submit_tool_outputs(
-                    thread_id=thread.id, run_id=run.id, tool_outputs=tool_outputs
-                )
-            elif status.status == "failed":
-                print("❌ Run failed:", status.last_error)
-                break
-
-            time.sleep(0.5)
-
-        # Print final response
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-        print("Bot:", messages.data[0].content[0].text.value)
         print()
 
 
@@ -0,0 +1,202 @@
+# agent/tracing.py
+"""
+Lightweight tracer for per-stage latency.
+
+Spans follow the OpenTelemetry data model (trace/span/parent IDs, unix-nano
+timestamps, attributes, status) and nest through a context variable, so a
+chat turn, the tools it calls and their stages form one trace. Finished
+spans are kept in memory per trace for the UI breakdown and, when
+TRACE_PATH is set, appended to a JSONL file as one span per line.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from agent.settings import TRACE_PATH
+
+_current = contextvars.ContextVar("current_span", default=None)
+_UNSET = object()
+
+
+class Span:
+    """
+    One timed stage. End it exactly once; `end` is idempotent.
+    """
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "attributes",
+        "start_ns",
+        "end_ns",
+        "duration",
+        "error",
+        "_started",
+    )
+
+    def __init__(self, tracer, name: str, parent=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.duration = None
+        self.error = None
+        self._started = time.perf_counter()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+        return self
+
+    def record_error(self, error: BaseException):
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self, error: BaseException = None):
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        self.end_ns = self.start_ns + int(self.duration * 1e9)
+        if error is not None:
+            self.record_error(error)
+        self.tracer.record(self)
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "status": (
+                {"code": "ERROR", "message": self.error}
+                if self.error
+                else {"code": "OK"}
+            ),
+        }
+
+
+class Tracer:
+    """
+    Creates spans, keeps the last `max_traces` traces in memory and exports
+    finished spans to `path` (JSONL) when set.
+    """
+
+    def __init__(self, path: str = None, max_traces: int = 200):
+        self.path = path
+        self.max_traces = max_traces
+        self._traces = OrderedDict()  # trace id -> [span dict]
+        self._lock = threading.Lock()
+        self._file = None
+
+    def start_span(self, name: str, parent=_UNSET, **attributes) -> Span:
+        """
+        Start a span under `parent` (the current span by default). The caller
+        ends it; use `span()` for a block.
+        """
+        if parent is _UNSET:
+            parent = _current.get()
+        return Span(self, name, parent, attributes)
+
+    @contextmanager
+    def use_span(self, span: Span):
+        """
+        Make `span` the parent of spans started in this block (and in tool
+        calls submitted from it).
+        """
+        token = _current.set(span)
+        try:
+            yield span
+        finally:
+            _current.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = self.start_span(name, **attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.end(error=e)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def record(self, span: Span):
+        data = span.to_dict()
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(data)
+            if self.path:
+                if self._file is None:
+                    directory = os.path.dirname(os.path.abspath(self.path))
+                    os.makedirs(directory, exist_ok=True)
+                    self._file = open(self.path, "a")
+                self._file.write(json.dumps(data) + "\n")
+                self._file.flush()
+
+    def get_trace(self, trace_id: str):
+        """
+        Finished spans of a trace, in start order.
+        """
+        with self._lock:
+            spans = list(self._traces.get(trace_id, []))
+        return sorted(spans, key=lambda s: s["startTimeUnixNano"])
+
+    def breakdown(self, trace_id: str):
+        """
+        [(depth, name, milliseconds), ...] in tree order, for display.
+        """
+        spans = self.get_trace(trace_id)
+        children = {}
+        for s in spans:
+            children.setdefault(s["parentSpanId"], []).append(s)
+        known = {s["spanId"] for s in spans}
+        roots = [s for s in spans if s["parentSpanId"] not in known]
+
+        rows = []
+
+        def walk(s, depth):
+            rows.append((depth, s["name"], s["durationMs"]))
+            for child in children.get(s["spanId"], []):
+                walk(child, depth + 1)
+
+        for root in roots:
+            walk(root, 0)
+        return rows
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def current_span():
+    return _current.get()
+
+
+tracer = Tracer(TRACE_PATH)
+atexit.register(tracer.close)
+span = tracer.span
+start_span = tracer.start_span
+use_span = tracer.use_span
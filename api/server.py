@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP API for the chatbot (ASGI: Starlette, served by uvicorn).
+
+    POST /ingest    {"path", "collection", "background"}: with "background",
+                     202 and a job ID instead of waiting for the ingest
+    GET  /jobs, GET /jobs/{id}, DELETE /jobs/{id} (cancel)
+    POST /retrieve  {"query", "k", "mode", "source", "page_start", "page_end",
+                     "ingested_after", "collection"}
+    POST /chat      {"message", "history", "collection", "eager_retrieval",
+                     "stream"}: Server-Sent Events (tool_calls, token, done,
+                     error), or one JSON answer when "stream" is false
+    GET  /health, GET /metrics
+
+The tools and the chat loop are synchronous, so they run on a bounded pool
+of worker threads while the event loop only moves requests and stream
+chunks. The OpenAI client, agent config and stores are created once per
+process and shared by every request. Each endpoint admits a limited number
+of requests at a time; the rest wait briefly for a slot and are then turned
+away with 503 and Retry-After, so a load balancer can retry elsewhere.
+
+    python api/server.py --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# Load environment variables BEFORE importing OpenAI
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import anyio
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from agent.agent_config import create_rag_agent
+from agent.chat import NO_ANSWER, ChatEngine, create_openai_client
+from agent.metrics import API_REJECTED, CONTENT_TYPE, REGISTRY
+from agent.settings import (
+    API_HOST,
+    API_INGEST_ROOT,
+    API_MAX_CHATS,
+    API_MAX_INGESTS,
+    API_MAX_RETRIEVALS,
+    API_PORT,
+    API_QUEUE_TIMEOUT,
+    API_THREADS,
+    EAGER_RETRIEVAL,
+    VECTOR_STORE,
+)
+from agent.store import collection_path, warm_up
+from agent.tools.dispatcher import TOOLS
+from agent.tools.fn_ingest import fn_ingest
+from agent.tools.fn_ingest_directory import fn_ingest_directory
+from agent.tools.fn_jobs import get_job_queue, job_summary, submit_job
+from agent.tools.fn_retrieve import fn_retrieve
+
+RETRIEVAL_MODES = ("hybrid", "vector", "keyword")
+RETRIEVE_OPTIONS = ("k", "mode", "source", "page_start", "page_end", "ingested_after")
+
+
+class ConcurrencyLimit:
+    """
+    At most `limit` requests of one endpoint in flight. Others wait up to
+    `queue_timeout` seconds for a slot, then get a 503.
+    """
+
+    def __init__(self, route: str, limit: int, queue_timeout: float):
+        self.route = route
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+
+    @property
+    def in_flight(self):
+        return self.limit - self._semaphore._value
+
+    async def acquire(self):
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+        try:
+            if self.queue_timeout <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            API_REJECTED.inc(route=self.route)
+            raise HTTPException(
+                503,
+                f"Too many concurrent {self.route} requests, retry later",
+                headers={"Retry-After": "1"},
+            )
+
+    def release(self):
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+async def read_json(request: Request) -> dict:
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(400, "Request body must be JSON")
+    if not isinstance(body, dict):
+        raise HTTPException(400, "Request body must be a JSON object")
+    return body
+
+
+def require_text(body: dict, field: str) -> str:
+    value = body.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise HTTPException(400, f"'{field}' must be a non-empty string")
+    return value
+
+
+def check_collection(body: dict):
+    collection = body.get("collection")
+    if collection is None:
+        return None
+    try:
+        collection_path(collection)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(400, str(e))
+    return collection
+
+
+def ingest_root_path(path: str) -> str:
+    """
+    Absolute path of `path`, taken relative to API_INGEST_ROOT as /ingest
+    does, e.g. for matching the `source` of ingested chunks.
+    """
+    return os.path.realpath(os.path.join(os.path.realpath(API_INGEST_ROOT), path))
+
+
+def resolve_ingest_path(path: str) -> str:
+    """
+    Absolute path of `path`, which must lie under API_INGEST_ROOT (relative
+    paths are taken relative to it).
+    """
+    root = os.path.realpath(API_INGEST_ROOT)
+    resolved = ingest_root_path(path)
+    if os.path.commonpath([root, resolved]) != root:
+        raise HTTPException(403, f"Only files under {API_INGEST_ROOT} can be ingested")
+    if not os.path.exists(resolved):
+        raise HTTPException(404, f"Not found: {path}")
+    return resolved
+
+
+def confine_ingest_tools(tools: dict) -> dict:
+    """
+    Copy of `tools` whose ingest tools only accept paths under
+    API_INGEST_ROOT, like /ingest, so a chat can't ingest the whole host,
+    and whose fn_retrieve reads `source` relative to it.
+    """
+
+    def confine(tool, argument, default=None):
+        def confined(**arguments):
+            try:
+                path = resolve_ingest_path(arguments.get(argument) or default)
+            except HTTPException as e:
+                return {"status": "error", "message": e.detail}
+            arguments[argument] = path
+            return tool(**arguments)
+
+        return confined
+
+    def retrieve(source: str = None, **arguments):
+        if isinstance(source, str):
+            source = ingest_root_path(source)
+        return tools["fn_retrieve"](source=source, **arguments)
+
+    confined = dict(tools)
+    confined["fn_retrieve"] = retrieve
+    confined["fn_ingest"] = confine(tools["fn_ingest"], "file_path")
+    confined["fn_ingest_directory"] = confine(
+        tools["fn_ingest_directory"], "directory", "."
+    )
+    return confined
+
+
+CHAT_TOOLS = confine_ingest_tools(TOOLS)
+
+
+def parse_history(history):
+    if history is None:
+        return []
+    if not isinstance(history, list) or not all(
+        isinstance(m, dict)
+        and m.get("role") in ("user", "assistant")
+        and isinstance(m.get("content"), str)
+        for m in history
+    ):
+        raise HTTPException(
+            400, "'history' must be a list of {role: user|assistant, content}"
+        )
+    return [{"role": m["role"], "content": m["content"]} for m in history]
+
+
+def sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def turn_summary(turn, tool_calls):
+    return {
+        "answer": turn.answer or NO_ANSWER,
+        "cached": turn.cached,
+        "tool_calls": list(tool_calls),
+        "trace_id": turn.trace_id,
+        "time_to_first_token": turn.time_to_first_token,
+        "total_time": turn.total_time,
+    }
+
+
+def turn_events(turn, tool_calls):
+    """
+    SSE events of one turn. Runs on worker threads, one step at a time.
+    """
+    sent = 0
+    try:
+        for token in turn:
+            if len(tool_calls) > sent:
+                yield sse("tool_calls", {"tools": tool_calls[sent:]})
+                sent = len(tool_calls)
+            yield sse("token", {"text": token})
+        yield sse("done", turn_summary(turn, tool_calls))
+    except Exception as e:
+        yield sse("error", {"error": str(e)})
+
+
+async def stream_turn(turn, tool_calls, limit: ConcurrencyLimit):
+    events = turn_events(turn, tool_calls)
+    try:
+        async for event in iterate_in_threadpool(events):
+            yield event
+    finally:
+        # Also on client disconnect: end the turn and free the slot
+        turn.cancel()
+        with anyio.CancelScope(shield=True):
+            await run_in_threadpool(events.close)
+        limit.release()
+
+
+async def health(request: Request):
+    limits = request.app.state.limits
+    return JSONResponse(
+        {
+            "status": "ok",
+            "in_flight": {name: limit.in_flight for name, limit in limits.items()},
+        }
+    )
+
+
+async def metrics(request: Request):
+    return PlainTextResponse(REGISTRY.expose(), media_type=CONTENT_TYPE)
+
+
+async def ingest(request: Request):
+    body = await read_json(request)
+    path = resolve_ingest_path(require_text(body, "path"))
+    collection = check_collection(body)
+    if body.get("background"):
+        # Queued jobs run on the job queue's own workers, not the ingest limit
+        kind = "fn_ingest_directory" if os.path.isdir(path) else "fn_ingest"
+        arguments = {"directory" if os.path.isdir(path) else "file_path": path}
+        job_id = await run_in_threadpool(submit_job, kind, collection, **arguments)
+        return JSONResponse(
+            {"status": "queued", "job_id": job_id},
+            status_code=202,
+            headers={"Location": f"/jobs/{job_id}"},
+        )
+    tool = fn_ingest_directory if os.path.isdir(path) else fn_ingest
+    async with request.app.state.limits["ingest"]:
+        result = await run_in_threadpool(tool, path, collection=collection)
+    return JSONResponse(result)
+
+
+async def jobs(request: Request):
+    recent = await run_in_threadpool(get_job_queue().recent)
+    return JSONResponse({"jobs": [job_summary(job) for job in recent]})
+
+
+async def job(request: Request):
+    job_id = request.path_params["job_id"]
+    queue = get_job_queue()
+    found = await run_in_threadpool(queue.get, job_id)
+    if found is None:
+        raise HTTPException(404, f"Unknown job: {job_id}")
+    if request.method == "DELETE":
+        if not await run_in_threadpool(queue.cancel, job_id):
+            raise HTTPException(409, f"Job {job_id} already {found['status']}")
+        found = await run_in_threadpool(queue.get, job_id)
+    return JSONResponse(job_summary(found))
+
+
+async def retrieve(request: Request):
+    body = await read_json(request)
+    query = require_text(body, "query")
+    options = {name: body[name] for name in RETRIEVE_OPTIONS if name in body}
+    if options.get("mode", RETRIEVAL_MODES[0]) not in RETRIEVAL_MODES:
+        raise HTTPException(400, f"'mode' must be one of {', '.join(RETRIEVAL_MODES)}")
+    if isinstance(options.get("source"), str):
+        options["source"] = ingest_root_path(options["source"])
+    collection = check_collection(body)
+    async with request.app.state.limits["retrieve"]:
+        try:
+            result = await run_in_threadpool(
+                fn_retrieve, query, collection=collection, **options
+            )
+        except (TypeError, ValueError) as e:
+            # Bad k, page numbers or date
+            raise HTTPException(400, str(e))
+    return JSONResponse(result)
+
+
+async def chat(request: Request):
+    body = await read_json(request)
+    message = require_text(body, "message")
+    history = parse_history(body.get("history"))
+    eager = body.get("eager_retrieval")
+    state = request.app.state
+    engine = ChatEngine(
+        state.client,
+        state.agent_config,
+        tools=CHAT_TOOLS,
+        collection=check_collection(body),
+        eager_retrieval=EAGER_RETRIEVAL if eager is None else bool(eager),
+    )
+    engine.history = history
+
+    tool_calls = []
+
+    def on_tool_calls(calls):
+        tool_calls.extend(tc.function.name for tc in calls)
+
+    limit = state.limits["chat"]
+    await limit.acquire()
+    streaming = False
+    try:
+        turn = await run_in_threadpool(engine.ask, message, on_tool_calls)
+        if body.get("stream", True):
+            streaming = True  # the stream releases the slot when it ends
+            return StreamingResponse(
+                stream_turn(turn, tool_calls, limit),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        await run_in_threadpool(turn.consume)
+    except Exception as e:
+        raise HTTPException(502, f"Chat failed: {e}")
+    finally:
+        if not streaming:
+            limit.release()
+    return JSONResponse(turn_summary(turn, tool_calls))
+
+
+async def http_error(request: Request, exc: HTTPException):
+    return JSONResponse(
+        {"error": exc.detail}, status_code=exc.status_code, headers=exc.headers
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+    app.state.limits = {
+        "chat": ConcurrencyLimit("chat", API_MAX_CHATS, API_QUEUE_TIMEOUT),
+        "retrieve": ConcurrencyLimit("retrieve", API_MAX_RETRIEVALS, API_QUEUE_TIMEOUT),
+        "ingest": ConcurrencyLimit("ingest", API_MAX_INGESTS, API_QUEUE_TIMEOUT),
+    }
+    app.state.client = create_openai_client()
+    app.state.agent_config = create_rag_agent()
+    await run_in_threadpool(warm_up)
+    # Resume jobs a previous run left unfinished
+    await run_in_threadpool(get_job_queue)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/metrics", metrics),
+        Route("/ingest", ingest, methods=["POST"]),
+        Route("/jobs", jobs),
+        Route("/jobs/{job_id}", job, methods=["GET", "DELETE"]),
+        Route("/retrieve", retrieve, methods=["POST"]),
+        Route("/chat", chat, methods=["POST"]),
+    ],
+    exception_handlers={HTTPException: http_error},
+    lifespan=lifespan,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="processes; each has its own store pool and concurrency limits "
+        "(needs VECTOR_STORE=flat: Chroma is not safe across processes)",
+    )
+    args = parser.parse_args()
+    if args.workers > 1 and VECTOR_STORE != "flat":
+        parser.error("--workers > 1 needs VECTOR_STORE=flat")
+
+    import uvicorn
+
+    os.chdir(project_root)
+    uvicorn.run(
+        "api.server:app" if args.workers > 1 else app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic PDF corpus of configurable size for benchmarks.
+
+Pages are filled with topic sentences in the style of the sample PDFs
+(create_sample_pdfs_simple.py), and every page carries one unique "needle"
+fact. The needles double as ground truth: each comes with a question whose
+answer is only on that page, which is what recall@k is measured against.
+"""
+
+import argparse
+import json
+import os
+import random
+
+TOPICS = {
+    "Artificial Intelligence": [
+        "Machine learning systems improve their performance on a task through experience.",
+        "Supervised learning trains on labeled input-output pairs for classification and regression.",
+        "Unsupervised learning discovers hidden patterns such as clusters in unlabeled data.",
+        "Reinforcement learning agents learn through rewards and penalties in an environment.",
+        "Deep neural networks learn hierarchical representations of images, text and speech.",
+        "Gradient descent adjusts model weights in the direction that reduces the loss.",
+    ],
+    "Python Programming": [
+        "Python is a high-level interpreted language known for readability and simplicity.",
+        "Lists, tuples, dictionaries and sets are the core built-in collection types.",
+        "Classes bundle data and methods, and inheritance lets a class reuse another's behaviour.",
+        "The standard library ships modules for files, networking, dates and concurrency.",
+        "Virtual environments isolate project dependencies installed with pip.",
+        "Generators produce values lazily, which keeps memory use flat for large inputs.",
+    ],
+    "Data Science": [
+        "Data cleaning handles missing values, outliers and inconsistent formats.",
+        "Exploratory data analysis reveals distributions, correlations and anomalies.",
+        "Feature engineering creates new inputs that improve model performance.",
+        "Models are evaluated with held-out data using metrics such as precision and recall.",
+        "Dashboards and visualizations communicate insights to non-technical stakeholders.",
+        "Distributed engines such as Spark process data sets too large for one machine.",
+    ],
+}
+
+ADJECTIVES = ["amber", "cobalt", "crimson", "golden", "ivory", "jade", "onyx", "silver"]
+ANIMALS = ["falcon", "otter", "lynx", "heron", "badger", "marten", "osprey", "viper"]
+
+
+def make_needle(rng: random.Random, topic: str, taken: set):
+    """
+    A fact unique to one page and the question that retrieves it.
+    """
+    while True:
+        codename = (
+            f"{rng.choice(ADJECTIVES)}-{rng.choice(ANIMALS)}-{rng.randint(100, 999)}"
+        )
+        if codename not in taken:
+            taken.add(codename)
+            break
+    code = f"{rng.choice('ABCDEFGH')}{rng.randint(1000, 9999)}"
+    return {
+        "needle": codename,
+        "fact": f"Project {codename} stores its {topic.lower()} archive under access code {code}.",
+        "query": f"Which access code does project {codename} use for its archive?",
+        "answer": code,
+    }
+
+
+def generate_corpus(
+    directory: str,
+    documents: int = 10,
+    pages: int = 5,
+    sentences_per_page: int = 24,
+    seed: int = 0,
+):
+    """
+    Write `documents` PDFs of `pages` pages each into `directory` and return
+    the ground-truth facts (also saved as facts.json).
+    """
+    from fpdf import FPDF
+
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    facts, taken = [], set()
+    topics = list(TOPICS)
+
+    for n in range(documents):
+        topic = topics[n % len(topics)]
+        path = os.path.join(directory, f"{topic.replace(' ', '_')}_{n:04d}.pdf")
+        pdf = FPDF()
+        for page in range(pages):
+            pdf.add_page()
+            pdf.set_font("Helvetica", "B", 16)
+            pdf.cell(0, 10, f"{topic}: part {page + 1}", new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font("Helvetica", "", 11)
+
+            needle = make_needle(rng, topic, taken)
+            sentences = [rng.choice(TOPICS[topic]) for _ in range(sentences_per_page)]
+            sentences.insert(rng.randrange(len(sentences) + 1), needle["fact"])
+            pdf.multi_cell(0, 6, " ".join(sentences))
+
+            facts.append({**needle, "source": path, "page": page + 1})
+        pdf.output(path)
+
+    with open(os.path.join(directory, "facts.json"), "w") as f:
+        json.dump(facts, f, indent=2)
+    return facts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="data/benchmark")
+    parser.add_argument("--documents", type=int, default=10)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    facts = generate_corpus(args.output, args.documents, args.pages, seed=args.seed)
+    print(f"✓ Created {args.documents} PDFs ({len(facts)} pages) in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
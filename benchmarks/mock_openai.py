@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI Chat Completions and Embeddings endpoints.
+
+Chat requests whose last message is from the user get an fn_retrieve tool
+call for that message; requests that already carry tool results get a short
+answer, streamed word by word when `stream` is set. Embeddings come from the
+local hashing backend. An optional delay simulates model latency.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add project root to Python path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agent.embeddings import HashingEmbeddings
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.endswith("/embeddings"):
+            return self._embeddings(body)
+        if self.path.endswith("/chat/completions"):
+            time.sleep(self.server.latency)
+            return self._chat(body)
+        self._json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+    def _embeddings(self, body):
+        texts = body["input"]
+        texts = [texts] if isinstance(texts, str) else texts
+        vectors = self.server.embeddings.embed_documents(texts)
+        self._json(
+            {
+                "object": "list",
+                "model": body.get("model", "mock"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": vector}
+                    for i, vector in enumerate(vectors)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+        )
+
+    def _chat(self, body):
+        messages = body["messages"]
+        if messages[-1]["role"] == "tool":
+            context = sum(len(m["content"]) for m in messages if m["role"] == "tool")
+            message = {
+                "role": "assistant",
+                "content": f"Based on {context} characters of retrieved context, "
+                "here is the answer to your question.",
+            }
+            finish_reason = "stop"
+        else:
+            arguments = json.dumps({"query": messages[-1]["content"]})
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": "call_0",
+                        "type": "function",
+                        "function": {"name": "fn_retrieve", "arguments": arguments},
+                    }
+                ],
+            }
+            finish_reason = "tool_calls"
+
+        if body.get("stream"):
+            return self._stream(message, finish_reason)
+        self._json(
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [
+                    {"index": 0, "message": message, "finish_reason": finish_reason}
+                ],
+                "usage": {
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "total_tokens": 0,
+                },
+            }
+        )
+
+    def _stream(self, message, finish_reason):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0}
+
+        def event(delta, finish=None):
+            chunk = {
+                **base,
+                "model": "mock",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        if message.get("tool_calls"):
+            call = message["tool_calls"][0]
+            event(
+                {
+                    "role": "assistant",
+                    "tool_calls": [
+                        {
+                            "index": 0,
+                            "id": call["id"],
+                            "type": "function",
+                            "function": call["function"],
+                        }
+                    ],
+                }
+            )
+        else:
+            for word in message["content"].split(" "):
+                event({"content": word + " "})
+        event({}, finish_reason)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _json(self, payload, status: int = 200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockOpenAIServer:
+    """
+    Run the mock in a background thread; use as a context manager.
+    `base_url` is what OPENAI_BASE_URL should be set to.
+    """
+
+    def __init__(self, port: int = 0, latency_ms: float = 0, dim: int = 384):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), MockOpenAIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency_ms / 1000
+        self.httpd.embeddings = HashingEmbeddings(dim)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    with MockOpenAIServer(args.port, args.latency_ms) as server:
+        print(f"Mock OpenAI API on {server.base_url} (Ctrl+C to stop)")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
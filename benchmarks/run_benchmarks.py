@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+End-to-end RAG benchmark with offline stand-ins.
+
+Generates a synthetic corpus, ingests it with a local embedder (hashing or
+fake backend, or the OpenAI backend pointed at the mock server), then
+measures retrieval latency and recall@k per retrieval mode, and full chat
+turns against the mock Chat Completions server. With --store flat it also
+compares the float16 and int8 encodings (FLAT_STORE_DTYPE). Results are
+printed and written as JSON so runs can be compared across releases.
+
+    python benchmarks/run_benchmarks.py --documents 50 --pages 10 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+
+def latency_summary(seconds):
+    """
+    p50/p95/p99/mean/max of a list of durations, in milliseconds.
+    """
+    if not seconds:
+        return {}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(ms),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=project_root,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def configure(args, store_dir: str):
+    """
+    Point the agent at a scratch store. Must run before anything from `agent`
+    is imported: settings are read at import time.
+    """
+    os.environ.update(
+        VECTOR_DB_PATH=store_dir,
+        VECTOR_STORE=args.store,
+        EMBEDDING_BACKEND=args.embedding_backend,
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY") or "sk-benchmark",
+        # Measure real work, not cache hits
+        QUERY_CACHE_SIZE="0",
+        ANSWER_CACHE_SIZE="0",
+    )
+    if args.embedding_backend == "openai":
+        os.environ["EMBEDDING_MODEL"] = "mock-embedding"
+
+
+def bench_ingest(corpus_dir: str):
+    from agent.tools.fn_ingest_directory import fn_ingest_directory
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn_ingest_directory(corpus_dir)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "files": result["files"],
+        "pages": result["pages"],
+        "chunks": result["chunks"],
+        "seconds": round(seconds, 3),
+        "pages_per_second": round(result["pages"] / seconds, 2),
+        "chunks_per_second": round(result["chunks"] / seconds, 2),
+        "python_heap_peak_bytes": peak,
+    }
+
+
+def bench_retrieval(facts, mode: str, k: int):
+    """
+    Latency and recall@k: a query is a hit when one of the top-k chunks
+    contains its needle.
+    """
+    from agent.tools.fn_retrieve import fn_retrieve
+
+    fn_retrieve(facts[0]["query"], k=k, mode=mode)  # warm up
+
+    tracemalloc.start()
+    latencies, hits, reciprocal_ranks = [], 0, []
+    for fact in facts:
+        started = time.perf_counter()
+        chunks = fn_retrieve(fact["query"], k=k, mode=mode)["chunks"]
+        latencies.append(time.perf_counter() - started)
+
+        ranks = [n for n, c in enumerate(chunks, 1) if fact["needle"] in c["text"]]
+        hits += bool(ranks)
+        reciprocal_ranks.append(1 / ranks[0] if ranks else 0.0)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "latency": latency_summary(latencies),
+        f"recall@{k}": round(hits / len(facts), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "python_heap_peak_bytes": peak,
+    }
+
+
+def bench_quantization(facts, k: int):
+    """
+    Bytes per vector and recall@k of the flat store's float16 and int8
+    encodings against exact float32 search, on the ingested corpus.
+    """
+    from agent.store import get_embeddings, get_vectordb
+
+    queries = get_embeddings().embed_documents([fact["query"] for fact in facts])
+    return get_vectordb().quantization_report(queries, k=k)
+
+
+def bench_chat(facts, turns: int, eager: bool):
+    """
+    Full turns (completion → tool call → retrieval → streamed answer)
+    against the mock server, one fresh conversation per question.
+    """
+    from agent.agent_config import create_rag_agent
+    from agent.chat import ChatEngine, create_openai_client
+
+    client, agent_config = create_openai_client(), create_rag_agent()
+    ChatEngine(client, agent_config).ask(facts[0]["query"]).consume()  # warm up
+    ttft, totals, completions = [], [], 0
+    for fact in (facts * (turns // len(facts) + 1))[:turns]:
+        engine = ChatEngine(client, agent_config, eager_retrieval=eager)
+        turn = engine.ask(fact["query"])
+        turn.consume()
+        if turn.time_to_first_token is not None:
+            ttft.append(turn.time_to_first_token)
+        totals.append(turn.total_time)
+        completions += len(turn.completions)
+
+    return {
+        "time_to_first_token": latency_summary(ttft),
+        "total": latency_summary(totals),
+        "completions_per_turn": round(completions / max(1, turns), 2),
+    }
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    corpus_dir = os.path.join(workdir, "corpus")
+
+    from benchmarks.corpus import generate_corpus
+
+    started = time.perf_counter()
+    facts = generate_corpus(corpus_dir, args.documents, args.pages, seed=args.seed)
+    corpus_seconds = time.perf_counter() - started
+    queries = facts[: args.queries] if args.queries else facts
+    configure(args, os.path.join(workdir, "store"))
+
+    from benchmarks.mock_openai import MockOpenAIServer
+
+    with MockOpenAIServer(latency_ms=args.llm_latency_ms) as server:
+        # Read when clients are created, so setting them now is early enough
+        os.environ["OPENAI_BASE_URL"] = os.environ["OPENAI_API_BASE"] = server.base_url
+
+        results = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "config": {
+                "documents": args.documents,
+                "pages_per_document": args.pages,
+                "queries": len(queries),
+                "k": args.k,
+                "store": args.store,
+                "embedding_backend": args.embedding_backend,
+                "llm_latency_ms": args.llm_latency_ms,
+                "seed": args.seed,
+            },
+            "corpus_seconds": round(corpus_seconds, 3),
+            "ingest": bench_ingest(corpus_dir),
+            "retrieval": {
+                mode: bench_retrieval(queries, mode, args.k) for mode in args.modes
+            },
+        }
+        if args.store == "flat":
+            results["quantization"] = bench_quantization(queries, args.k)
+        if args.chat_turns:
+            results["chat"] = {
+                "tool_call": bench_chat(queries, args.chat_turns, eager=False),
+                "eager_retrieval": bench_chat(queries, args.chat_turns, eager=True),
+            }
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["max_rss_bytes"] = rss if sys.platform == "darwin" else rss * 1024
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--documents", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument(
+        "--queries", type=int, default=0, help="limit queries (0: one per page)"
+    )
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument(
+        "--modes",
+        type=lambda value: value.split(","),
+        default=["hybrid", "vector", "keyword"],
+    )
+    parser.add_argument("--store", choices=["chroma", "flat"], default="chroma")
+    parser.add_argument(
+        "--embedding-backend",
+        choices=["hashing", "fake", "openai"],
+        default="hashing",
+        help="openai: the OpenAI client against the mock server (needs tiktoken's "
+        "encoding files, downloaded on first use)",
+    )
+    parser.add_argument("--chat-turns", type=int, default=20)
+    parser.add_argument("--llm-latency-ms", type=float, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = run(args)
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -88,10 +88,11 @@ def main():
     print()
     print("1. 🌐 Streamlit Web UI (Recommended)")
     print("2. 💻 Command Line Interface")
-    print("3. ❌ Exit")
+    print("3. 🔌 HTTP API Server")
+    print("4. ❌ Exit")
     print()
 
-    choice = input("Enter choice (1-3): ").strip()
+    choice = input("Enter choice (1-4): ").strip()
     print()
 
     if choice == "1":
@@ -130,6 +131,21 @@ def main():
             print("\n\n👋 Goodbye!")
 
     elif choice == "3":
+        print("🚀 Starting HTTP API server...")
+        port = os.getenv("API_PORT", "8000")
+        print(f"Listening on http://localhost:{port} (/ingest, /retrieve, /chat)")
+        print()
+        print("Press Ctrl+C to stop")
+        print()
+
+        import subprocess
+
+        try:
+            subprocess.run([sys.executable, "api/server.py"])
+        except KeyboardInterrupt:
+            print("\n\n👋 Shutting down...")
+
+    elif choice == "4":
         print("👋 Goodbye!")
         sys.exit(0)
 
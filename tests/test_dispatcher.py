@@ -0,0 +1,32 @@
+# tests/test_dispatcher.py
+"""
+Cancellation of concurrent tool calls (agent/tools/dispatcher.py).
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from agent.tools.dispatcher import dispatch_tool_calls
+
+
+def tool_call(name):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments="{}"))
+
+
+def test_cancel_event_stops_waiting_for_tools():
+    release = threading.Event()
+    tools = {"slow": lambda: release.wait(10) and {"status": "success"}}
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+
+    started = time.monotonic()
+    try:
+        results = dispatch_tool_calls(
+            [tool_call("slow")], timeout=10, cancel_event=cancel, tools=tools
+        )
+    finally:
+        release.set()
+
+    assert time.monotonic() - started < 2
+    assert [result for _, result in results] == [{"error": "slow was cancelled"}]
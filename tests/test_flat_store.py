@@ -0,0 +1,95 @@
+# tests/test_flat_store.py
+"""
+Concurrency tests for agent/flat_store.py: searches running while another
+thread (or process) writes must never fail or return mismatched rows.
+"""
+
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+import agent.flat_store as flat_store
+from agent.flat_store import FlatVectorStore
+
+DIM = 16
+
+
+def text_of(doc_id):
+    return f"text of {doc_id}"
+
+
+def upsert(store, ids, rng):
+    store.upsert_embeddings(
+        ids,
+        rng.normal(size=(len(ids), DIM)),
+        [text_of(i) for i in ids],
+        [{"source": f"/docs/{i.split('-')[0]}.pdf", "page": 1} for i in ids],
+    )
+
+
+def test_searches_while_writing(tmp_path, monkeypatch):
+    # Compact often so searches also race generation switches
+    monkeypatch.setattr(flat_store, "COMPACT_MIN_DEAD_ROWS", 50)
+    for dtype in ("float32", "int8"):
+        store = FlatVectorStore(str(tmp_path / dtype), None, dtype=dtype)
+        rng = np.random.default_rng(0)
+        upsert(store, [f"seed-{n}" for n in range(100)], rng)
+        errors, done = [], threading.Event()
+
+        def search(seed):
+            rng = np.random.default_rng(seed)
+            try:
+                while not done.is_set():
+                    where = {"source": "/docs/w.pdf"} if seed % 2 else None
+                    for hit in store.search_by_vector(rng.normal(size=DIM), 5, where):
+                        assert hit["text"] == text_of(hit["id"])
+                    found = store.get(ids=["seed-1", "w-3"])
+                    assert found["documents"] == [text_of(i) for i in found["ids"]]
+                    store.count()
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=search, args=(n,)) for n in range(3)]
+        for reader in readers:
+            reader.start()
+        try:
+            for window in range(60):
+                ids = [f"w-{n}" for n in range(window * 10, window * 10 + 40)]
+                upsert(store, ids, rng)  # overlaps the previous window
+                store.delete(
+                    ids=[f"w-{n}" for n in range(window * 10 - 20, window * 10)]
+                )
+        finally:
+            done.set()
+            for reader in readers:
+                reader.join()
+
+        assert errors == []
+        assert store.count() == 100 + 40
+        assert store._generation.number > 1  # compacted at least once
+
+
+WRITER = """
+import sys
+import numpy as np
+from agent.flat_store import FlatVectorStore
+store = FlatVectorStore(sys.argv[1], None)
+rng = np.random.default_rng(int(sys.argv[2]))
+for window in range(10):
+    ids = [f"{sys.argv[2]}-{window}-{n}" for n in range(20)]
+    store.upsert_embeddings(ids, rng.normal(size=(20, 16)), ids, [{}] * 20)
+"""
+
+
+def test_processes_append_to_one_store(tmp_path):
+    writers = [
+        subprocess.Popen([sys.executable, "-c", WRITER, str(tmp_path), str(n)])
+        for n in range(3)
+    ]
+    assert [writer.wait() for writer in writers] == [0, 0, 0]
+
+    stored = FlatVectorStore(str(tmp_path), None).get()
+    assert len(set(stored["ids"])) == 3 * 10 * 20
+    assert stored["ids"] == stored["documents"]
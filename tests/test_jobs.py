@@ -0,0 +1,185 @@
+# tests/test_jobs.py
+"""
+JobQueue (agent/jobs.py) on a temporary job table.
+"""
+
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+
+from agent.jobs import (
+    CANCELLED,
+    FAILED,
+    FINISHED,
+    KEEP_FINISHED_SECONDS,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobQueue,
+)
+
+EXITING = """
+import sys, time
+from agent.jobs import JobQueue
+
+def slow(progress):
+    for step in range(10):
+        time.sleep(0.5)
+        progress(pages=step + 1, total_pages=10)
+    return {}
+
+JobQueue(sys.argv[1], {"slow": slow}, workers=1).submit("slow")
+time.sleep(0.7)
+"""
+
+
+def test_exit_interrupts_running_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    started = time.monotonic()
+    subprocess.run([sys.executable, "-c", EXITING, path], check=True, timeout=30)
+
+    # Stopped at the next progress report instead of running to the end
+    assert time.monotonic() - started < 4
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT status FROM jobs").fetchall() == [("queued",)]
+
+
+def test_jobs_are_scoped_to_their_collection(tmp_path):
+    blocker = threading.Event()
+
+    def wait(collection, progress):
+        blocker.wait(5)
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), {"wait": wait})
+    try:
+        team_a = queue.submit("wait", collection="team-a")
+        team_b = queue.submit("wait", collection="team-b")
+
+        assert [job["id"] for job in queue.recent(collection="team-a")] == [team_a]
+        assert {job["id"] for job in queue.recent()} == {team_a, team_b}
+        assert not queue.cancel(team_b, collection="team-a")
+        assert queue.cancel(team_b, collection="team-b")
+    finally:
+        blocker.set()
+        queue.close()
+
+
+def wait_until_finished(queue, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in FINISHED:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_each_job_is_claimed_once(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    runs, lock = Counter(), threading.Lock()
+
+    def count(n, progress):
+        with lock:
+            runs[n] += 1
+        time.sleep(0.01)
+
+    first = JobQueue(path, {"count": count}, workers=2)
+    second = JobQueue(path, {"count": count}, workers=2)
+    try:
+        job_ids = [first.submit("count", n=n) for n in range(20)]
+        # The second queue races for the same jobs, as another process would
+        for job_id in job_ids:
+            second._executor.submit(second._run, job_id)
+        jobs = [wait_until_finished(first, job_id) for job_id in job_ids]
+    finally:
+        first.close()
+        second.close()
+
+    assert runs == Counter(range(20))
+    assert {(job["status"], job["attempts"]) for job in jobs} == {(SUCCEEDED, 1)}
+
+
+def test_failures_are_retried_unless_permanent(tmp_path):
+    calls = Counter()
+
+    def flaky(name, progress):
+        calls[name] += 1
+        if name == "missing":
+            raise FileNotFoundError(name)
+        if name == "broken" or calls[name] < 3:
+            raise RuntimeError(f"attempt {calls[name]}")
+        return {"status": "success"}
+
+    queue = JobQueue(
+        str(tmp_path / "jobs.sqlite"),
+        {"flaky": flaky},
+        max_retries=2,
+        retry_delay=0.01,
+    )
+    try:
+        flaky_job = wait_until_finished(queue, queue.submit("flaky", name="flaky"))
+        broken = wait_until_finished(queue, queue.submit("flaky", name="broken"))
+        missing = wait_until_finished(queue, queue.submit("flaky", name="missing"))
+    finally:
+        queue.close()
+
+    assert (flaky_job["status"], flaky_job["attempts"]) == (SUCCEEDED, 3)
+    assert flaky_job["result"] == {"status": "success"}
+    assert flaky_job["error"] is None
+    assert (broken["status"], broken["attempts"]) == (FAILED, 3)
+    assert broken["error"] == "RuntimeError: attempt 3"
+    assert (missing["status"], missing["attempts"]) == (FAILED, 1)
+
+
+def test_cancel_queued_and_running_jobs(tmp_path):
+    started, release = threading.Event(), threading.Event()
+
+    def work(progress):
+        started.set()
+        while not release.wait(0.01):
+            progress(pages=1, total_pages=2)
+
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"), {"work": work}, workers=1)
+    try:
+        running = queue.submit("work")
+        started.wait(5)
+        waiting = queue.submit("work")  # queued behind the running job
+
+        assert queue.cancel(waiting)
+        assert queue.get(waiting)["status"] == CANCELLED
+        assert queue.cancel(running)
+        assert wait_until_finished(queue, running)["status"] == CANCELLED
+        assert not queue.cancel(running)  # already finished
+        assert not queue.cancel("unknown")
+    finally:
+        release.set()
+        queue.close()
+
+
+def test_recover_requeues_jobs_of_dead_processes(tmp_path):
+    path = str(tmp_path / "jobs.sqlite")
+    JobQueue(path, {}).close()  # creates the table
+    dead_owner = f"{socket.gethostname()}:{2**30}"
+    now = time.time()
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO jobs (id, kind, arguments, status, created_at, "
+            "finished_at, owner) VALUES (?, 'echo', '{}', ?, ?, ?, ?)",
+            [
+                ("orphaned", RUNNING, now, None, dead_owner),
+                ("waiting", QUEUED, now, None, None),
+                ("expired", SUCCEEDED, 0, now - KEEP_FINISHED_SECONDS - 1, None),
+            ],
+        )
+
+    queue = JobQueue(path, {"echo": lambda progress: {"status": "success"}})
+    try:
+        assert wait_until_finished(queue, "orphaned")["status"] == SUCCEEDED
+        assert wait_until_finished(queue, "waiting")["status"] == SUCCEEDED
+        assert queue.get("expired") is None
+    finally:
+        queue.close()
@@ -0,0 +1,47 @@
+# tests/test_keyword_index.py
+"""
+Two BM25Index / IngestManifest objects on one file stand in for two
+processes sharing a store: neither may lose the other's saved changes.
+"""
+
+from agent.keyword_index import BM25Index
+from agent.manifest import IngestManifest
+
+
+def test_saves_merge_instead_of_overwriting(tmp_path):
+    path = str(tmp_path / "keyword_index.json")
+    first, second = BM25Index(path), BM25Index(path)
+    first.add(["a1", "a2"], ["alpha error ERR-1", "alpha notes"])
+    second.add(["b1"], ["beta error ERR-2"])
+    first.save()
+    second.save()
+
+    # Each sees the other's chunks without being re-created
+    assert [doc_id for doc_id, _ in first.search("ERR-2")] == ["b1"]
+    assert [doc_id for doc_id, _ in second.search("ERR-1")] == ["a1"]
+
+    first.remove(["a2"])
+    second.add(["b2"], ["beta notes"])
+    second.save()
+    first.save()
+    assert len(BM25Index(path)) == 3
+    assert BM25Index(path).get("a2") is None
+
+
+def test_manifest_saves_merge(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    pdf_a, pdf_b = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    pdf_a.write_bytes(b"a")
+    pdf_b.write_bytes(b"b")
+    first, second = IngestManifest(path), IngestManifest(path)
+    first.record(str(pdf_a), "hash-a", ["a1"], "model")
+    second.record(str(pdf_b), "hash-b", ["b1"], "model")
+    first.save()
+    second.save()
+
+    assert sorted(IngestManifest(path).paths()) == [str(pdf_a), str(pdf_b)]
+    assert first.get(str(pdf_b))["chunk_ids"] == ["b1"]
+
+    second.remove(str(pdf_a))
+    second.save()
+    assert first.paths() == [str(pdf_b)]
@@ -0,0 +1,20 @@
+# tests/test_metrics.py
+"""
+Per-thread metric shards (agent/metrics.py).
+"""
+
+import threading
+
+from agent.metrics import Counter
+
+
+def test_finished_threads_do_not_pile_up_shards():
+    counter = Counter("test_events_total", "Events.", ["kind"])
+    for _ in range(200):
+        thread = threading.Thread(target=counter.inc, kwargs={"kind": "a"})
+        thread.start()
+        thread.join()
+
+    # Folded in as new threads register, before any scrape
+    assert len(counter._shards) <= 1
+    assert [value for *_, value in counter.samples()] == [200]
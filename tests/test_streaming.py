@@ -0,0 +1,97 @@
+# tests/test_streaming.py
+"""
+StreamedCompletion (agent/streaming.py) over fake stream chunks shaped like
+the OpenAI client's ChatCompletionChunk.
+"""
+
+from types import SimpleNamespace
+
+from agent.streaming import StreamedCompletion
+
+
+def chunk(content=None, tool_calls=None, finish_reason=None, usage=None):
+    if content is None and tool_calls is None and finish_reason is None:
+        choices = []  # the final usage-only chunk
+    else:
+        delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+        choices = [SimpleNamespace(delta=delta, finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def tool_delta(index, id=None, name=None, arguments=None):
+    function = None
+    if name is not None or arguments is not None:
+        function = SimpleNamespace(name=name, arguments=arguments)
+    return SimpleNamespace(index=index, id=id, function=function)
+
+
+def test_text_deltas_are_yielded_and_joined():
+    usage = SimpleNamespace(prompt_tokens=12, completion_tokens=3)
+    completion = StreamedCompletion(
+        iter(
+            [
+                chunk(content=""),
+                chunk(content="Gradient "),
+                chunk(content="descent."),
+                chunk(finish_reason="stop"),
+                chunk(usage=usage),
+            ]
+        )
+    )
+
+    assert list(completion) == ["Gradient ", "descent."]
+    assert completion.content == "Gradient descent."
+    assert completion.tool_calls == []
+    assert completion.finish_reason == "stop"
+    assert completion.usage is usage
+    assert 0 <= completion.time_to_first_token <= completion.total_time
+
+
+def test_parallel_tool_calls_are_assembled_by_index():
+    stream = [
+        # The second call starts first; ids and names come once, arguments
+        # arrive in pieces and the two calls interleave
+        chunk(tool_calls=[tool_delta(1, id="call_b", name="fn_retrieve")]),
+        chunk(tool_calls=[tool_delta(0, id="call_a", name="fn_retrieve")]),
+        chunk(tool_calls=[tool_delta(0, arguments='{"query": ')]),
+        chunk(tool_calls=[tool_delta(1, arguments='{"query": "ERR-2"')]),
+        chunk(
+            tool_calls=[
+                tool_delta(0, arguments='"ERR-1"}'),
+                tool_delta(1, arguments=', "k": 2}'),
+            ]
+        ),
+        chunk(tool_calls=[tool_delta(1)]),  # no function part at all
+        chunk(finish_reason="tool_calls"),
+    ]
+    completion = StreamedCompletion(iter(stream))
+
+    assert list(completion) == []
+    calls = completion.tool_calls
+    assert [(c.id, c.type, c.function.name) for c in calls] == [
+        ("call_a", "function", "fn_retrieve"),
+        ("call_b", "function", "fn_retrieve"),
+    ]
+    assert [c.function.arguments for c in calls] == [
+        '{"query": "ERR-1"}',
+        '{"query": "ERR-2", "k": 2}',
+    ]
+    assert completion.finish_reason == "tool_calls"
+    assert completion.time_to_first_token is None
+    assert completion.usage is None
+
+
+def test_text_before_tool_calls_is_kept():
+    completion = StreamedCompletion(
+        iter(
+            [
+                chunk(content="Let me check."),
+                chunk(tool_calls=[tool_delta(0, id="call_a", name="fn_job_status")]),
+                chunk(tool_calls=[tool_delta(0, arguments="{}")]),
+                chunk(finish_reason="tool_calls"),
+            ]
+        )
+    )
+
+    assert completion.consume() == "Let me check."
+    assert [c.function.arguments for c in completion.tool_calls] == ["{}"]
@@ -1,6 +1,5 @@
 import os
 import sys
-import time
 from pathlib import Path
 
 # Add project root to Python path
@@ -13,9 +12,19 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import streamlit as st
-from openai import OpenAI
 
-from agent.agent_config import create_rag_agent, get_rag_tools, get_rag_instructions
+from agent.agent_config import create_rag_agent
+from agent.chat import NO_ANSWER, ChatEngine, create_openai_client
+from agent.jobs import FINISHED, describe_progress
+from agent.metrics import start_metrics_server
+from agent.store import (
+    COLLECTION_NAME_RE,
+    DEFAULT_COLLECTION,
+    list_collections,
+    warm_up,
+)
+from agent.tools.fn_jobs import get_job_queue
+from agent.tracing import tracer
 
 st.title("RAG Chatbot using OpenAI Responses API")
 
@@ -27,99 +36,157 @@ if not os.getenv("OPENAI_API_KEY"):
     )
     st.stop()
 
-client = OpenAI()
 
-# Initialize session state
-if "agent_config" not in st.session_state:
-    st.session_state.agent_config = create_rag_agent()
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+@st.cache_resource
+def get_shared_resources():
+    """
+    One pooled OpenAI client, agent config and warm vector store per process,
+    plus the /metrics endpoint.
+    """
+    warm_up()
+    start_metrics_server()
+    return create_openai_client(), create_rag_agent()
+
+
+# Initialize session state: one conversation engine per browser session
+if "engine" not in st.session_state:
+    client, agent_config = get_shared_resources()
+    st.session_state.engine = ChatEngine(client, agent_config)
+engine = st.session_state.engine
+
+# Collection (workspace) this conversation searches and ingests into
+current = engine.collection or DEFAULT_COLLECTION
+if "collection" not in st.session_state:
+    st.session_state.collection = current
+
+
+def add_collection():
+    """
+    Select the typed collection name and clear the field, so the selectbox
+    stays in charge afterwards.
+    """
+    name = st.session_state.new_collection.strip()
+    st.session_state.new_collection = ""
+    if COLLECTION_NAME_RE.match(name):
+        st.session_state.collection = name
+    elif name:
+        st.session_state.invalid_collection = name
+
+
+collections = list_collections()
+if st.session_state.collection not in collections:
+    collections.append(st.session_state.collection)
+collection = st.sidebar.selectbox("Collection", collections, key="collection")
+st.sidebar.text_input(
+    "New collection",
+    placeholder="team-name",
+    key="new_collection",
+    on_change=add_collection,
+)
+if st.session_state.pop("invalid_collection", None):
+    st.sidebar.error("Use letters, digits, '-' or '_' (max 64 characters)")
+if collection != current:
+    # Switching collections starts a fresh conversation
+    engine.collection = collection
+    engine.reset()
+
+stream_responses = st.sidebar.toggle("Stream responses", value=True)
+engine.eager_retrieval = st.sidebar.toggle(
+    "Retrieve before asking the model",
+    value=engine.eager_retrieval,
+    help="Search the documents up front and send the chunks with the first request",
+)
+
+
+@st.fragment(run_every=2)
+def show_jobs(collection):
+    """
+    Background ingestion jobs of this conversation's collection. Reruns on
+    its own every 2s, so progress updates without blocking or rerunning the
+    chat.
+    """
+    jobs = get_job_queue().recent(5, collection=collection)
+    if not jobs:
+        return
+    st.subheader("Ingestion jobs")
+    for job in jobs:
+        arguments = job["arguments"]
+        target = os.path.basename(
+            arguments.get("file_path") or arguments.get("directory", "")
+        )
+        fraction, text = describe_progress(job["progress"])
+        if job["status"] in FINISHED:
+            icons = {"succeeded": "✅", "failed": "❌", "cancelled": "⏹️"}
+            icon = icons[job["status"]]
+            st.caption(f"{icon} {target}: {job['status']}")
+            if job["error"] and job["status"] == "failed":
+                st.caption(job["error"])
+            continue
+        st.progress(fraction or 0.0, text=f"{target}: {text or job['status']}")
+        if st.button("Cancel", key=f"cancel-{job['id']}"):
+            get_job_queue().cancel(job["id"], collection=collection)
+
+
+with st.sidebar:
+    show_jobs(collection)
+
+# Per-stage timings of the last turn, filled in once it has run
+timings = st.sidebar.empty()
 
 # Display chat history
-for message in st.session_state.messages:
+for message in engine.history:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
 # Chat input
 if query := st.chat_input("Ask a question:"):
-    # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": query})
     with st.chat_message("user"):
         st.markdown(query)
 
-    # Prepare messages for the API
-    api_messages = [{"role": "system", "content": st.session_state.agent_config["instructions"]}]
-    api_messages.extend(st.session_state.messages)
+    def show_tool_calls(tool_calls):
+        names = ", ".join(tc.function.name for tc in tool_calls)
+        st.caption(f"🔧 Calling tools: {names}")
 
     # Create response with tools using Chat Completions API
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                response = client.chat.completions.create(
-                    model=st.session_state.agent_config["model"],
-                    messages=api_messages,
-                    tools=st.session_state.agent_config["tools"],
-                    tool_choice="auto"
+        turn = engine.ask(query, on_tool_calls=show_tool_calls)
+        try:
+            # Render tokens as they arrive, or all at once when streaming is off
+            if stream_responses:
+                st.write_stream(turn)
+            else:
+                with st.spinner("Thinking..."):
+                    turn.consume()
+                st.markdown(turn.answer)
+
+            if not turn.answer:
+                st.markdown(NO_ANSWER)
+
+        except Exception as e:
+            answer = f"Error: {str(e)}"
+            st.markdown(answer)
+            engine.add_exchange(query, answer)
+
+        if turn.cached:
+            st.caption("⚡ Answered from cache")
+        elif turn.total_time is not None:
+            ttft = turn.time_to_first_token
+            st.caption(
+                f"⏱️ first token {ttft:.2f}s · total {turn.total_time:.2f}s"
+                if ttft is not None
+                else f"⏱️ total {turn.total_time:.2f}s"
+            )
+        st.session_state.last_trace = turn.trace_id
+
+if st.session_state.get("last_trace"):
+    rows = tracer.breakdown(st.session_state.last_trace)
+    if rows:
+        with timings.container():
+            with st.expander("⏱️ Last turn breakdown"):
+                st.code(
+                    "\n".join(
+                        f"{'  ' * depth}{name:<{32 - 2 * depth}} {ms:>9.1f} ms"
+                        for depth, name, ms in rows
+                    ),
+                    language=None,
                 )
-
-                # Handle tool calls if any
-                message = response.choices[0].message
-                answer = message.content or ""
-
-                tool_calls = message.tool_calls or []
-                if tool_calls:
-                    # Execute tool calls
-                    api_messages.append({
-                        "role": "assistant",
-                        "content": answer,
-                        "tool_calls": [
-                            {
-                                "id": tc.id,
-                                "type": tc.type,
-                                "function": {
-                                    "name": tc.function.name,
-                                    "arguments": tc.function.arguments
-                                }
-                            } for tc in tool_calls
-                        ]
-                    })
-
-                    for tool_call in tool_calls:
-                        function_name = tool_call.function.name
-                        arguments = tool_call.function.arguments
-
-                        # Import and execute the function
-                        import json
-                        from agent.tools.fn_ingest import fn_ingest
-                        from agent.tools.fn_retrieve import fn_retrieve
-
-                        args = json.loads(arguments)
-
-                        if function_name == "fn_ingest":
-                            result = fn_ingest(**args)
-                        elif function_name == "fn_retrieve":
-                            result = fn_retrieve(**args)
-                        else:
-                            result = {"error": "Unknown function"}
-
-                        api_messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": json.dumps(result)
-                        })
-
-                    # Create follow-up response
-                    follow_up = client.chat.completions.create(
-                        model=st.session_state.agent_config["model"],
-                        messages=api_messages,
-                        tools=st.session_state.agent_config["tools"],
-                        tool_choice="auto"
-                    )
-
-                    answer = follow_up.choices[0].message.content or "I couldn't generate a response."
-
-            except Exception as e:
-                answer = f"Error: {str(e)}"
-
-        st.markdown(answer)
-        st.session_state.messages.append({"role": "assistant", "content": answer})